@@ -0,0 +1,6 @@
+"""
+Benchmarks of h5tui on synthetic HDF5 files
+
+Run with `python -m benchmarks run` from the root of the repository, see
+`python -m benchmarks --help`.
+"""
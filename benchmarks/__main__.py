@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+
+import h5py
+import textual
+
+from benchmarks.pilot import benchmark
+from benchmarks.workloads import WORKLOADS, workload_file, workload_steps
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_revision():
+    """Commit of the working tree, marked if it has local changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def in_new_process(func, *args):
+    """
+    Call a function in a fresh interpreter
+
+    Such that every run starts cold and measures its own peak memory (which a
+    spawned process inherits from the size of its parent at fork).
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(func, *args).result()
+
+
+def run(args):
+    revision = git_revision()
+    results = {
+        "revision": revision,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "h5py": h5py.__version__,
+        "hdf5": h5py.version.hdf5_version,
+        "textual": textual.__version__,
+        "workloads": {},
+    }
+    for name in args.workloads or WORKLOADS:
+        # files are generated in another process, which keeps this one small
+        fname = in_new_process(workload_file, name, args.data_dir, args.scale)
+        steps = workload_steps(name, args.scale)
+        runs = [in_new_process(benchmark, fname, steps) for _ in range(args.repeat)]
+        results["workloads"][name] = runs
+        print(name)
+        for step, seconds in summarize(runs).items():
+            print(f"  {step:<16} {seconds:10.4f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as result_file:
+        json.dump(results, result_file, indent=2)
+    print(f"Results saved to {output}")
+
+
+def summarize(runs):
+    """Median duration of every step (over repetitions) and peak memory"""
+    durations = {}
+    for result in runs:
+        for step, seconds in result["timings"].items():
+            durations.setdefault(step, []).extend(seconds)
+    summary = {step: statistics.median(values) for step, values in durations.items()}
+    summary["peak_rss_mib"] = max(result["peak_rss_mib"] for result in runs)
+    return summary
+
+
+def compare(args):
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.contender) as contender_file:
+        contender = json.load(contender_file)
+    print(f"{'':<26} {baseline['revision']:>12} {contender['revision']:>12}  ratio")
+    for name, runs in contender["workloads"].items():
+        if name not in baseline["workloads"]:
+            continue
+        old = summarize(baseline["workloads"][name])
+        new = summarize(runs)
+        for step, value in new.items():
+            if step in old:
+                ratio = value / old[step] if old[step] else float("nan")
+                label = f"{name}.{step}"
+                print(f"{label:<26} {old[step]:12.4f} {value:12.4f} {ratio:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="h5tui benchmarks"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "workloads", nargs="*", help=f"any of {', '.join(WORKLOADS)} (default: all)"
+    )
+    run_parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="size of the generated files relative to the full workloads",
+    )
+    run_parser.add_argument(
+        "--repeat", type=int, default=3, help="number of runs of every workload"
+    )
+    run_parser.add_argument(
+        "--data-dir",
+        default=os.path.join(os.path.dirname(__file__), "data"),
+        help="directory of the generated files, which are reused",
+    )
+    run_parser.add_argument(
+        "--output", help="result file, by default named after the git revision"
+    )
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("contender")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    unknown = set(getattr(args, "workloads", ())) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import time
+
+from h5tui.h5tui import H5TUIApp
+
+TERMINAL_SIZE = (160, 48)
+
+# keys pressed for each step, see select() for the steps naming a member
+STEP_KEYS = {
+    "enter_group": ["l"],
+    "open_dataset": ["l"],
+    "view_attrs": ["a"],
+    "toggle_truncate": ["t"],
+    "plot": ["p"],
+    "aggregate": ["A"],
+    "page_down": ["pagedown"],
+    "scroll_end": ["G"],
+    "back": ["h"],
+}
+
+
+def select(app, name):
+    """Highlight a member of the current group, returns False if it is missing"""
+    listing = app._listings[app._cur_dir]
+    for idx in range(len(listing)):
+        if listing[idx].name == name:
+            app._column1._selector_widget.highlighted = idx
+            return True
+    return False
+
+
+async def settle(app, pilot):
+    """Wait until the application is idle and all its workers are done"""
+    await pilot.pause()
+    await app.workers.wait_for_complete()
+    await pilot.pause()
+
+
+async def run_steps(fname, steps):
+    """
+    Drive the application through `steps` and time them
+
+    Returns the startup time and the durations of the steps in seconds,
+    keyed by step name. Steps naming a missing member are skipped.
+    """
+    timings = {}
+    start = time.perf_counter()
+    app = H5TUIApp(fname)
+    async with app.run_test(size=TERMINAL_SIZE) as pilot:
+        await settle(app, pilot)
+        timings["startup"] = [time.perf_counter() - start]
+        for step, *args in steps:
+            if args and not select(app, *args):
+                continue
+            await settle(app, pilot)
+            start = time.perf_counter()
+            for key in STEP_KEYS[step]:
+                await pilot.press(key)
+            await settle(app, pilot)
+            timings.setdefault(step, []).append(time.perf_counter() - start)
+            if step == "view_attrs":
+                app.pop_screen()
+                await settle(app, pilot)
+    return timings
+
+
+def peak_rss_mib():
+    """Peak resident memory of the current process"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def benchmark(fname, steps):
+    """Run a workload in the current process, meant to be a fresh one"""
+    timings = asyncio.run(run_steps(fname, steps))
+    return {"timings": timings, "peak_rss_mib": peak_rss_mib()}
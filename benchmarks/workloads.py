@@ -0,0 +1,151 @@
+import os
+
+import h5py
+import numpy as np
+
+# bytes written at once when generating large datasets
+WRITE_BLOCK_BYTES = 64 << 20
+
+
+# objects of the attrs workload
+ATTRS_OBJECTS = 1000
+
+
+def scaled(count, scale):
+    return max(int(count * scale), 1)
+
+
+def generate_wide(fname, scale):
+    """A group with 10^5 members, half of them small datasets"""
+    with h5py.File(fname, "w", track_order=False) as h5file:
+        members = h5file.create_group("members")
+        for idx in range(scaled(100_000, scale)):
+            name = f"m{idx:07d}"
+            if idx % 2:
+                members.create_dataset(name, data=np.arange(4))
+            else:
+                members.create_group(name)
+
+
+def generate_deep(fname, scale):
+    """A binary tree of groups with a dataset in every leaf"""
+    depth = max(int(np.log2(scaled(1 << 12, scale))), 1)
+
+    def fill(group, level):
+        if level == depth:
+            group.create_dataset("leaf", data=np.linspace(0, 1, 100))
+            return
+        for branch in ("a", "b"):
+            fill(group.create_group(branch), level + 1)
+
+    with h5py.File(fname, "w") as h5file:
+        fill(h5file.create_group("tree"), 0)
+
+
+def generate_chunked(fname, scale):
+    """A 2 GiB gzip compressed float32 array of smooth, compressible data"""
+    ncols = 4096
+    nrows = scaled(1 << 17, scale)
+    with h5py.File(fname, "w") as h5file:
+        dset = h5file.create_dataset(
+            "data",
+            shape=(nrows, ncols),
+            dtype=np.float32,
+            chunks=(min(256, nrows), ncols),
+            compression="gzip",
+            compression_opts=1,
+            shuffle=True,
+        )
+        rows = WRITE_BLOCK_BYTES // (4 * ncols)
+        cols = np.linspace(0, 8 * np.pi, ncols, dtype=np.float32)
+        rng = np.random.default_rng(0)
+        for start in range(0, nrows, rows):
+            stop = min(start + rows, nrows)
+            phase = np.arange(start, stop, dtype=np.float32)[:, None] / 1000
+            block = np.sin(cols + phase)
+            block += rng.normal(0, 0.01, block.shape).astype(np.float32)
+            dset[start:stop] = block
+
+
+def generate_table(fname, scale):
+    """A compound dataset with 5 * 10^6 rows including a string column"""
+    nrows = scaled(5_000_000, scale)
+    dtype = np.dtype([("id", "<i8"), ("value", "<f8"), ("label", "S16")])
+    with h5py.File(fname, "w") as h5file:
+        dset = h5file.create_dataset(
+            "table", shape=(nrows,), dtype=dtype, chunks=(min(65536, nrows),)
+        )
+        rows = WRITE_BLOCK_BYTES // dtype.itemsize
+        for start in range(0, nrows, rows):
+            stop = min(start + rows, nrows)
+            block = np.empty(stop - start, dtype=dtype)
+            block["id"] = np.arange(start, stop)
+            block["value"] = np.sqrt(block["id"])
+            block["label"] = np.char.add(b"row-", block["id"].astype("S10"))
+            dset[start:stop] = block
+
+
+def generate_attrs(fname, scale):
+    """10^3 objects with 50 attributes each"""
+    with h5py.File(fname, "w") as h5file:
+        objects = h5file.create_group("objects")
+        for idx in range(scaled(ATTRS_OBJECTS, scale)):
+            dset = objects.create_dataset(f"obj{idx:05d}", data=np.arange(10))
+            for key in range(50):
+                dset.attrs[f"attr{key:02d}"] = (
+                    f"value {key}" if key % 2 else np.arange(key)
+                )
+
+
+def attrs_steps(scale):
+    """Steps of the attrs workload, viewing an object which exists at `scale`"""
+    member = min(42, scaled(ATTRS_OBJECTS, scale) - 1)
+    return [("enter_group", "objects"), ("view_attrs", f"obj{member:05d}"), ("back",)]
+
+
+# name: (generator, steps driving the application, see benchmarks.pilot, or a
+# function of the scale returning them)
+WORKLOADS = {
+    "wide": (
+        generate_wide,
+        [("enter_group", "members"), ("scroll_end",), ("back",)],
+    ),
+    "deep": (
+        generate_deep,
+        [("enter_group", "tree")] + [("enter_group", "a")] * 12,
+    ),
+    "chunked": (
+        generate_chunked,
+        [
+            ("open_dataset", "data"),
+            ("toggle_truncate",),
+            ("toggle_truncate",),
+            ("plot",),
+            ("plot",),
+            ("aggregate",),
+            ("back",),
+        ],
+    ),
+    "table": (
+        generate_table,
+        [("open_dataset", "table"), ("page_down",), ("scroll_end",), ("back",)],
+    ),
+    "attrs": (generate_attrs, attrs_steps),
+}
+
+
+def workload_steps(name, scale):
+    steps = WORKLOADS[name][1]
+    return steps(scale) if callable(steps) else steps
+
+
+def workload_file(name, data_dir, scale):
+    """Path of the file of a workload, which is generated if missing"""
+    fname = os.path.join(data_dir, f"{name}-{scale:g}.h5")
+    if not os.path.exists(fname):
+        os.makedirs(data_dir, exist_ok=True)
+        generate = WORKLOADS[name][0]
+        tmp_name = fname + ".tmp"
+        generate(tmp_name, scale)
+        os.replace(tmp_name, fname)
+    return fname
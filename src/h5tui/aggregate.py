@@ -0,0 +1,137 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+
+from h5tui.reader import iter_blocks, read_hyperslab
+
+
+class RunningStats:
+    """Mergeable summary statistics of a stream of array blocks"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # sum of squared deviations from the mean (Welford/Chan)
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sumsq = 0.0
+
+    @classmethod
+    def from_array(cls, data):
+        stats = cls()
+        data = np.asarray(data).ravel()
+        if data.size == 0:
+            return stats
+        values = data.astype(np.float64, copy=False)
+        stats.count = values.size
+        stats.mean = float(values.mean())
+        deviations = values - stats.mean
+        stats.m2 = float(np.dot(deviations, deviations))
+        stats.min = float(data.min())
+        stats.max = float(data.max())
+        stats.sumsq = float(np.dot(values, values))
+        return stats
+
+    def merge(self, other):
+        """Fold the statistics of another block into these"""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        # unlike the builtins, these propagate NaN like np.min and np.max
+        self.min = float(np.minimum(self.min, other.min))
+        self.max = float(np.maximum(self.max, other.max))
+        self.sumsq += other.sumsq
+        return self
+
+    def summary(self):
+        return {
+            "mean": self.mean,
+            "std": float(np.sqrt(self.m2 / self.count)),
+            "max": self.max,
+            "min": self.min,
+            "L2 norm": float(np.sqrt(self.sumsq)),
+        }
+
+
+def is_aggregatable(obj):
+    return (
+        np.issubdtype(obj.dtype, np.number)
+        and not np.issubdtype(obj.dtype, np.complexfloating)
+        and obj.size > 1
+    )
+
+
+def aggregate_blocks(data, reduce, init, progress=None, cancelled=None, workers=None):
+    """
+    Stream over a dataset block by block and fold the reduced blocks
+
+    `reduce` maps a block to a partial result exposing `merge`, starting
+    from `init`. Blocks are read and reduced on a thread pool; only a bounded
+    number of blocks is in flight at any time. `progress(done, total)` is
+    called after every block and `cancelled()` is polled in between.
+    Returns None if the aggregation was cancelled.
+    """
+    workers = workers or min(os.cpu_count() or 1, 8)
+    total, selections = iter_blocks(data)
+
+    def task(selection):
+        return reduce(read_hyperslab(data, selection))
+
+    result = init
+    done = 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for selection in selections:
+            if cancelled is not None and cancelled():
+                for future in pending:
+                    future.cancel()
+                return None
+            pending.append(pool.submit(task, selection))
+            if len(pending) >= 2 * workers:
+                result = result.merge(pending.popleft().result())
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+        while pending:
+            if cancelled is not None and cancelled():
+                for future in pending:
+                    future.cancel()
+                return None
+            result = result.merge(pending.popleft().result())
+            done += 1
+            if progress is not None:
+                progress(done, total)
+    return result
+
+
+def aggregate_stats(data, progress=None, cancelled=None, workers=None):
+    """
+    RunningStats of a numeric dataset computed in a single pass
+
+    Returns the statistics and the number of rows they cover, which is fewer
+    than the dataset has if it grew during the pass.
+    """
+    stats = aggregate_blocks(
+        data,
+        RunningStats.from_array,
+        RunningStats(),
+        progress=progress,
+        cancelled=cancelled,
+        workers=workers,
+    )
+    if stats is None:
+        return None
+    return stats, stats.count // max(int(np.prod(data.shape[1:])), 1)
+
+
+def aggregate_dataset(data, progress=None, cancelled=None, workers=None):
+    """Summary statistics of a numeric dataset computed in a single pass"""
+    result = aggregate_stats(data, progress, cancelled, workers)
+    return None if result is None else result[0].summary()
@@ -0,0 +1,232 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import json
+import math
+import os
+import posixpath
+import sys
+
+import h5py
+
+from h5tui.aggregate import aggregate_dataset, is_aggregatable
+from h5tui.index import walk_groups
+from h5tui.metadata import DATASET
+from h5tui.reader import dataset_nbytes, disable_parallel_reads, needs_paging
+
+# default upper bound on the address space of a worker process, in MiB
+WORKER_MEMORY_MIB = 4096
+# error of the tasks lost when a worker process dies, which breaks the pool
+WORKER_DIED_ERROR = "a worker process died, e.g. by exceeding --max-memory"
+
+
+def init_worker(max_bytes):
+    """
+    Initializer of the worker processes capping their address space
+
+    The pool of processes provides the parallelism, such that chunks are not
+    decompressed on threads of their own, which would oversubscribe the CPUs.
+    """
+    disable_parallel_reads()
+    if not max_bytes:
+        return
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def object_record(fname, path, item):
+    """JSON serializable metadata of an object, as listed by the viewer"""
+    return {
+        "file": fname,
+        "path": path,
+        "kind": item.kind,
+        "num_attrs": item.num_attrs,
+        "shape": None if item.shape is None else list(item.shape),
+        "dtype": None if item.dtype is None else str(item.dtype),
+        "chunks": None if item.chunks is None else list(item.chunks),
+        "filters": list(item.filters),
+        "target": None if item.target is None else list(item.target),
+        "nbytes": None,
+        "summary": None,
+    }
+
+
+def summarize(h5file, record):
+    """Add the size and summary statistics of a dataset to its record"""
+    dset = h5file[record["path"]]
+    record["nbytes"] = int(dataset_nbytes(dset))
+    if is_aggregatable(dset):
+        # the process pool provides the parallelism, see init_worker
+        record["summary"] = aggregate_dataset(dset, workers=1)
+    return record
+
+
+def inventory_file(fname):
+    """
+    List all objects of a file and summarize its small datasets
+
+    Returns the finished records, and the records of the datasets which are
+    large enough to be summarized in a task of their own.
+    """
+    done, large = [], []
+    try:
+        with h5py.File(fname, "r") as h5file:
+            for group, items in walk_groups(h5file):
+                for item in items:
+                    record = object_record(
+                        fname, posixpath.join(group, item.name), item
+                    )
+                    if item.kind != DATASET:
+                        done.append(record)
+                    elif needs_paging(h5file[record["path"]]):
+                        large.append(record)
+                    else:
+                        done.append(with_error(summarize, h5file, record))
+    except (OSError, MemoryError) as err:
+        done.append({"file": fname, "error": str(err)})
+    return done, large
+
+
+def summarize_large(record):
+    """Summarize a single large dataset, returning it like `inventory_file`"""
+    try:
+        with h5py.File(record["file"], "r") as h5file:
+            return [with_error(summarize, h5file, record)], []
+    except OSError as err:
+        record["error"] = str(err)
+        return [record], []
+
+
+def with_error(func, h5file, record):
+    """Record failures of a single dataset instead of aborting the inventory"""
+    try:
+        return func(h5file, record)
+    except (OSError, MemoryError, TypeError, ValueError) as err:
+        record["error"] = f"{type(err).__name__}: {err}"
+        return record
+
+
+def format_record(record):
+    """Human readable summary of a record on a single line"""
+    if "path" not in record:
+        return f"{record['file']}: {record['error']}"
+    line = f"{record['file']}:{record['path']} ({record['kind']})"
+    if record["shape"] is not None:
+        line += f" <{record['dtype']}> {tuple(record['shape'])}"
+    if record["target"] is not None:
+        fname, path = record["target"]
+        line += f" -> {path}" if fname is None else f" -> {fname}:{path}"
+    if record.get("error"):
+        line += f" error: {record['error']}"
+    elif record["summary"] is not None:
+        line += " " + "; ".join(
+            f"{key} = {value:.5g}" for key, value in record["summary"].items()
+        )
+    return line
+
+
+def submit(pool, func, *args):
+    """
+    Submit a task to a process pool, or return a future which failed with
+    BrokenProcessPool if the pool is broken
+    """
+    try:
+        return pool.submit(func, *args)
+    except BrokenProcessPool as err:
+        future = Future()
+        future.set_exception(err)
+        return future
+
+
+def json_safe(value):
+    """Replace NaN and infinities, which JSON has no literal for, by None"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def json_line(record):
+    """A record as a line of strict JSON"""
+    return json.dumps(json_safe(record), allow_nan=False)
+
+
+def run_summary(
+    fnames, workers=None, max_memory=WORKER_MEMORY_MIB, out=None, as_json=False
+):
+    """
+    Summarize the datasets of several files on a process pool
+
+    Files are first listed in parallel, then their large datasets are
+    summarized as separate tasks. Records are written (as JSON lines if
+    `as_json`) as soon as they complete, in no particular order. Returns
+    False if tasks were lost because a worker process died, their files or
+    datasets are written with an error.
+    """
+    out = out or sys.stdout
+    complete = True
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(max_memory << 20,),
+    ) as pool:
+        # the record written for every task if it is lost
+        tasks = {
+            submit(pool, inventory_file, fname): {"file": fname} for fname in fnames
+        }
+        while tasks:
+            finished, _ = wait(tasks, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = tasks.pop(future)
+                try:
+                    records, large = future.result()
+                except BrokenProcessPool:
+                    complete = False
+                    task["error"] = WORKER_DIED_ERROR
+                    records, large = [task], []
+                for record in large:
+                    tasks[submit(pool, summarize_large, record)] = record
+                for record in records:
+                    out.write(
+                        (json_line(record) if as_json else format_record(record)) + "\n"
+                    )
+                out.flush()
+    return complete
+
+
+def summary(argv):
+    """Entry point of `h5tui summary`"""
+    parser = argparse.ArgumentParser(
+        prog="h5tui summary",
+        description="Print the metadata and summary statistics of all datasets. "
+        "Exits with status 1 if a worker process died, e.g. by exceeding "
+        "--max-memory.",
+    )
+    parser.add_argument("files", nargs="+", help="HDF5 files")
+    parser.add_argument(
+        "--json", action="store_true", help="write one JSON object per line"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=WORKER_MEMORY_MIB,
+        help="address space limit of each worker process in MiB (0 to disable)",
+    )
+    args = parser.parse_args(argv)
+    complete = run_summary(
+        args.files,
+        workers=args.workers or os.cpu_count(),
+        max_memory=args.max_memory,
+        as_json=args.json,
+    )
+    sys.exit(0 if complete else 1)
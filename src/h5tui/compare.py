@@ -0,0 +1,441 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import multiprocessing
+import os
+import posixpath
+import sys
+
+import h5py
+import numpy as np
+
+from h5tui.batch import (
+    WORKER_DIED_ERROR,
+    WORKER_MEMORY_MIB,
+    init_worker,
+    json_line,
+    submit,
+)
+from h5tui.metadata import DATASET, GROUP, LINK_KINDS, GroupListing, item_info
+from h5tui.reader import block_rows, open_dataset, open_file, read_hyperslab
+
+# data compared by a single task of the worker pool, large datasets are split
+# into several tasks of whole rows
+TASK_BYTES = 256 << 20
+# data of each file held in memory at once by a task
+DIFF_BLOCK_BYTES = 8 << 20
+NUMERIC_KINDS = "biufc"
+# interval at which a comparison checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.2
+
+
+class CompareError(ValueError):
+    """Raised for objects which cannot be compared"""
+
+
+def join_path(root, path):
+    """Absolute path of an object given relative to a root group"""
+    return posixpath.join(root, path) if path else root
+
+
+def comparable(dtype_a, dtype_b):
+    """Checks if the elements of two types can be compared"""
+    if dtype_a.names or dtype_b.names:
+        return dtype_a.names == dtype_b.names and all(
+            comparable(dtype_a.fields[name][0], dtype_b.fields[name][0])
+            for name in dtype_a.names
+        )
+    if dtype_a.subdtype or dtype_b.subdtype:
+        return (
+            dtype_a.shape == dtype_b.shape
+            and dtype_a.subdtype is not None
+            and dtype_b.subdtype is not None
+            and comparable(dtype_a.subdtype[0], dtype_b.subdtype[0])
+        )
+    if dtype_a.kind in NUMERIC_KINDS and dtype_b.kind in NUMERIC_KINDS:
+        return True
+    strings = (h5py.check_string_dtype(dtype_a), h5py.check_string_dtype(dtype_b))
+    if None not in strings:
+        return True
+    return dtype_a == dtype_b
+
+
+def _maximum(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return max(first, second)
+
+
+def diff_values(a, b, rtol=0.0, atol=0.0):
+    """
+    Compare two blocks element by element
+
+    Returns the mask of the differing elements, and the largest absolute and
+    relative (to `b`) difference of numeric elements, or None. Numbers
+    differ by more than `atol + rtol * abs(b)`, NaNs at the same position
+    are equal. Rows of compound blocks differ if any of their fields does.
+    """
+    if a.dtype.names:
+        mask = np.zeros(a.shape, dtype=bool)
+        max_abs = max_rel = None
+        for name in a.dtype.names:
+            field_mask, field_abs, field_rel = diff_values(a[name], b[name], rtol, atol)
+            # subarray fields differ if any of their elements does
+            mask |= field_mask.reshape(a.shape + (-1,)).any(axis=-1)
+            max_abs = _maximum(max_abs, field_abs)
+            max_rel = _maximum(max_rel, field_rel)
+        return mask, max_abs, max_rel
+
+    if a.dtype.kind not in NUMERIC_KINDS or b.dtype.kind not in NUMERIC_KINDS:
+        return np.asarray(a != b, dtype=bool), None, None
+
+    with np.errstate(all="ignore"):
+        if a.dtype.kind == "b":
+            a = a.astype(np.int8)
+        if b.dtype.kind == "b":
+            b = b.astype(np.int8)
+        exact = a.dtype.kind in "iu" and b.dtype.kind in "iu"
+        wide = np.complex128 if "c" in (a.dtype.kind, b.dtype.kind) else np.float64
+        diff = np.abs(a.astype(wide) - b.astype(wide))
+        reference = np.abs(b)
+        if exact and not rtol and not atol:
+            # without tolerance integers are compared without a conversion
+            mask = a != b
+        else:
+            mask = ~((a == b) | (diff <= atol + rtol * reference))
+            if not exact:
+                mask &= ~(np.isnan(a) & np.isnan(b))
+        finite = np.isfinite(diff)
+        max_abs = float(diff[finite].max()) if finite.any() else None
+        relative = finite & (reference > 0)
+        max_rel = (
+            float((diff[relative] / reference[relative]).max())
+            if relative.any()
+            else None
+        )
+    return mask, max_abs, max_rel
+
+
+def merge_diff(record, part):
+    """Add the comparison of a part of a dataset to its record"""
+    if part.get("error"):
+        record["error"] = part["error"]
+        return record
+    record["mismatches"] += part["mismatches"]
+    record["max_abs"] = _maximum(record["max_abs"], part["max_abs"])
+    record["max_rel"] = _maximum(record["max_rel"], part["max_rel"])
+    if part["first_index"] is not None and (
+        record["first_index"] is None or part["first_index"] < record["first_index"]
+    ):
+        record["first_index"] = part["first_index"]
+    return record
+
+
+def diff_rows(fname_a, path_a, fname_b, path_b, start, stop, rtol, atol):
+    """
+    Compare the rows `start` to `stop` of two datasets, block by block
+
+    Runs on the worker pool, opening both files. Scalar datasets are
+    compared as a whole.
+    """
+    part = {"mismatches": 0, "max_abs": None, "max_rel": None, "first_index": None}
+    try:
+        with open_file(fname_a) as file_a, open_file(fname_b) as file_b:
+            dset_a = open_dataset(file_a, path_a)
+            dset_b = open_dataset(file_b, path_b)
+            if not dset_a.shape:
+                selections = [()]
+            else:
+                rows = block_rows(
+                    dset_a.shape, dset_a.dtype.itemsize, dset_a.chunks, DIFF_BLOCK_BYTES
+                )
+                selections = [
+                    np.s_[row : min(row + rows, stop)]
+                    for row in range(start, stop, rows)
+                ]
+            for selection in selections:
+                block_a = np.asarray(read_hyperslab(dset_a, selection))
+                block_b = np.asarray(read_hyperslab(dset_b, selection))
+                mask, max_abs, max_rel = diff_values(block_a, block_b, rtol, atol)
+                merge_diff(
+                    part,
+                    {
+                        "mismatches": int(np.count_nonzero(mask)),
+                        "max_abs": max_abs,
+                        "max_rel": max_rel,
+                        "first_index": None,
+                    },
+                )
+                if part["first_index"] is None and mask.any():
+                    index = np.unravel_index(int(np.argmax(mask)), mask.shape)
+                    offset = (selection.start,) if selection else ()
+                    part["first_index"] = [
+                        int(i) + o for i, o in zip(index, offset + (0,) * len(index))
+                    ]
+    except (OSError, MemoryError, TypeError, ValueError) as err:
+        part["error"] = f"{type(err).__name__}: {err}"
+    return part
+
+
+def pair_objects(file_a, root_a, file_b, root_b):
+    """
+    Match the objects below two groups (or two datasets) by name
+
+    Yields the path of every object relative to the roots together with its
+    metadata in both files, None for an object missing from a file. Groups
+    reachable through several hard links are only descended into once, soft
+    and external links below the roots are paired but not followed.
+    """
+    pending = [
+        (
+            "",
+            item_info(file_a.id, root_a.encode("utf8"), follow_links=True),
+            item_info(file_b.id, root_b.encode("utf8"), follow_links=True),
+        )
+    ]
+    seen = set()
+    while pending:
+        path, item_a, item_b = pending.pop()
+        yield path, item_a, item_b
+        if (
+            item_a is None
+            or item_b is None
+            or item_a.kind != GROUP
+            or item_b.kind != GROUP
+            or item_a.addr in seen
+        ):
+            continue
+        seen.add(item_a.addr)
+        members = []
+        for h5file, root in ((file_a, root_a), (file_b, root_b)):
+            listing = GroupListing(h5file[join_path(root, path)])
+            members.append({listing[i].name: listing[i] for i in range(len(listing))})
+        members_a, members_b = members
+        names = list(members_a) + [name for name in members_b if name not in members_a]
+        for name in reversed(names):
+            pending.append(
+                (
+                    posixpath.join(path, name),
+                    members_a.get(name),
+                    members_b.get(name),
+                )
+            )
+
+
+def diff_record(path, item_a, item_b):
+    """
+    Record of the comparison of two objects, before their data is compared
+
+    Returns None for pairs of groups (or named datatypes), whose members are
+    compared instead.
+    """
+    record = {
+        "path": path,
+        "status": "pending",
+        "size": None,
+        "mismatches": 0,
+        "max_abs": None,
+        "max_rel": None,
+        "first_index": None,
+    }
+    if item_a is None or item_b is None:
+        record["status"] = "only_a" if item_b is None else "only_b"
+    elif item_a.kind != item_b.kind:
+        record["status"] = "kind"
+    elif item_a.kind in LINK_KINDS:
+        record["status"] = "equal" if item_a.target == item_b.target else "target"
+    elif item_a.kind != DATASET:
+        return None
+    elif item_a.shape != item_b.shape:
+        record["status"] = "shape"
+    elif not comparable(item_a.dtype, item_b.dtype):
+        record["status"] = "dtype"
+    else:
+        record["size"] = int(np.prod(item_a.shape))
+    return record
+
+
+def row_ranges(item):
+    """Rows of a dataset compared by each task of the worker pool"""
+    if not item.shape:
+        return [(0, 1)]
+    rows = block_rows(item.shape, item.dtype.itemsize, item.chunks, TASK_BYTES)
+    nrows = item.shape[0] if np.prod(item.shape) else 0
+    return [(start, min(start + rows, nrows)) for start in range(0, nrows, rows)]
+
+
+def compare_files(
+    fname_a,
+    fname_b,
+    root_a="/",
+    root_b=None,
+    rtol=0.0,
+    atol=0.0,
+    workers=None,
+    max_memory=WORKER_MEMORY_MIB,
+    cancelled=None,
+):
+    """
+    Compare the datasets below two groups (or two datasets) of two files
+
+    Datasets are split into ranges of rows which are compared on a process
+    pool, a block at a time, such that files larger than the memory can be
+    compared. Yields the record of every dataset once all of its rows are
+    compared, and the record of every object missing from one of the files
+    or of a different kind, in no particular order. `root_b` defaults to
+    `root_a`, which allows comparing two groups of the same file. Stops
+    early once `cancelled()` returns true.
+    """
+    root_b = root_a if root_b is None else root_b
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        # forking the threads of the viewer is unsafe
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(max_memory << 20,),
+    )
+    try:
+        with open_file(fname_a) as file_a, open_file(fname_b) as file_b:
+            for h5file, root in ((file_a, root_a), (file_b, root_b)):
+                if root not in h5file:
+                    raise CompareError(f"{h5file.filename} has no object {root}")
+            pairs = list(pair_objects(file_a, root_a, file_b, root_b))
+        records, remaining, paths = {}, {}, {}
+        for path, item_a, item_b in pairs:
+            record = diff_record(path, item_a, item_b)
+            if record is None:
+                continue
+            ranges = row_ranges(item_a) if record["status"] == "pending" else []
+            if not ranges:
+                if record["status"] == "pending":
+                    record["status"] = "equal"
+                yield record
+                continue
+            records[path] = record
+            remaining[path] = len(ranges)
+            for start, stop in ranges:
+                future = submit(
+                    pool,
+                    diff_rows,
+                    fname_a,
+                    join_path(root_a, path),
+                    fname_b,
+                    join_path(root_b, path),
+                    start,
+                    stop,
+                    rtol,
+                    atol,
+                )
+                paths[future] = path
+
+        pending = set(paths)
+        while pending:
+            finished, pending = wait(
+                pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED
+            )
+            if cancelled is not None and cancelled():
+                return
+            for future in finished:
+                path = paths.pop(future)
+                try:
+                    part = future.result()
+                except BrokenProcessPool:
+                    # a worker died, e.g. by exceeding the memory limit, which
+                    # fails the remaining parts of all datasets
+                    part = {"error": WORKER_DIED_ERROR}
+                merge_diff(records[path], part)
+                remaining[path] -= 1
+                if remaining[path] == 0:
+                    record = records.pop(path)
+                    if record.get("error"):
+                        record["status"] = "error"
+                    else:
+                        record["status"] = "differ" if record["mismatches"] else "equal"
+                    yield record
+    finally:
+        # tasks which are already running complete on their own, the others
+        # are cancelled (shutdown only takes cancel_futures from Python 3.9)
+        for future in paths:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def format_diff(record):
+    """Human readable description of the comparison of an object"""
+    status = record["status"]
+    if status == "equal":
+        return "equal"
+    if status == "differ":
+        text = f"{record['mismatches']} of {record['size']} elements differ"
+        if record["max_abs"] is not None:
+            text += f", max abs {record['max_abs']:.5g}"
+        if record["max_rel"] is not None:
+            text += f", max rel {record['max_rel']:.5g}"
+        return text + f", first at {tuple(record['first_index'])}"
+    return {
+        "only_a": "only in the first file",
+        "only_b": "only in the second file",
+        "kind": "objects of different kinds",
+        "target": "links to different targets",
+        "shape": "different shapes",
+        "dtype": "incomparable types",
+        "pending": "not compared yet",
+    }.get(status, f"error: {record.get('error')}")
+
+
+def diff(argv):
+    """Entry point of `h5tui diff`"""
+    parser = argparse.ArgumentParser(
+        prog="h5tui diff",
+        description="Compare the datasets of two files, or of two groups, chunk by "
+        "chunk. Exits with status 1 if any object differs.",
+    )
+    parser.add_argument("file_a", help="HDF5 file")
+    parser.add_argument("file_b", help="HDF5 file, possibly the same file")
+    parser.add_argument(
+        "path_a", nargs="?", default="/", help="group or dataset (default: /)"
+    )
+    parser.add_argument(
+        "path_b", nargs="?", help="group or dataset of file_b (default: path_a)"
+    )
+    parser.add_argument("--rtol", type=float, default=0.0, help="relative tolerance")
+    parser.add_argument("--atol", type=float, default=0.0, help="absolute tolerance")
+    parser.add_argument(
+        "--json", action="store_true", help="write one JSON object per line"
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="also list the datasets which are equal"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=WORKER_MEMORY_MIB,
+        help="address space limit of each worker process in MiB (0 to disable)",
+    )
+    args = parser.parse_args(argv)
+    differ = False
+    try:
+        for record in compare_files(
+            args.file_a,
+            args.file_b,
+            args.path_a,
+            args.path_b,
+            rtol=args.rtol,
+            atol=args.atol,
+            workers=args.workers or os.cpu_count(),
+            max_memory=args.max_memory,
+        ):
+            differ |= record["status"] != "equal"
+            if args.json:
+                print(json_line(record), flush=True)
+            elif args.all or record["status"] != "equal":
+                path = join_path(args.path_a, record["path"])
+                print(f"{path}: {format_diff(record)}", flush=True)
+    except (OSError, CompareError) as err:
+        sys.exit(f"h5tui diff: error: {err}")
+    sys.exit(1 if differ else 0)
@@ -0,0 +1,274 @@
+import numpy as np
+
+from h5tui.aggregate import aggregate_blocks
+from h5tui.reader import block_rows, dataset_nbytes, read_hyperslab
+
+# items kept per level of a quantile sketch, the rank error of its quantiles
+# is about the number of levels over SKETCH_SIZE
+SKETCH_SIZE = 2048
+# the estimate is computed from SAMPLE_BLOCKS blocks of rows picked at random,
+# of SAMPLE_BYTES in total
+SAMPLE_BYTES = 4 << 20
+SAMPLE_BLOCKS = 16
+HISTOGRAM_BINS = 20
+QUANTILES = (0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0)
+
+
+def is_distribution_dtype(dtype):
+    return (
+        np.issubdtype(dtype, np.number)
+        and not np.issubdtype(dtype, np.complexfloating)
+        and not dtype.shape
+    )
+
+
+def distribution_fields(dtype):
+    """Fields of a compound dtype whose distribution can be computed"""
+    return [
+        name for name in dtype.names if is_distribution_dtype(dtype.fields[name][0])
+    ]
+
+
+class QuantileSketch:
+    """
+    Mergeable sketch of the distribution of a stream of values (KLL style)
+
+    Items are kept in levels, an item of level h standing for 2**h values.
+    A level holding more than `size` items is compacted: its items are sorted
+    and every other one, starting at a random offset, is promoted to the next
+    level. Merging two sketches concatenates their levels and compacts them.
+    """
+
+    def __init__(self, size=SKETCH_SIZE):
+        self.size = size
+        self.levels = []
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_array(cls, values, size=SKETCH_SIZE):
+        """Sketch of the finite float64 values of an array"""
+        sketch = cls(size)
+        if values.size == 0:
+            return sketch
+        sketch.count = values.size
+        values = np.sort(values)
+        sketch.min, sketch.max = float(values[0]), float(values[-1])
+        # as many compactions at once as it takes to fit into a level
+        height = 0
+        while values.size >> height > size:
+            height += 1
+        if height:
+            stride = 1 << height
+            values = values[np.random.randint(stride) :: stride]
+        sketch.levels = [np.empty(0)] * height + [values]
+        return sketch
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        if other.count == 0:
+            return self
+        for height, items in enumerate(other.levels):
+            if height < len(self.levels):
+                self.levels[height] = np.concatenate([self.levels[height], items])
+            else:
+                self.levels.append(items)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compact()
+        return self
+
+    def _compact(self):
+        height = 0
+        while height < len(self.levels):
+            items = self.levels[height]
+            if items.size > self.size:
+                items = np.sort(items)
+                # an odd item out stays at its level
+                kept, pairs = items[items.size & ~1 :], items[: items.size & ~1]
+                promoted = pairs[np.random.randint(2) :: 2]
+                self.levels[height] = kept
+                if height + 1 < len(self.levels):
+                    self.levels[height + 1] = np.concatenate(
+                        [self.levels[height + 1], promoted]
+                    )
+                else:
+                    self.levels.append(promoted)
+            height += 1
+
+    def quantiles(self, qs):
+        """Approximate quantiles, the extremes are exact"""
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [
+                np.full(level.size, 1 << height)
+                for height, level in enumerate(self.levels)
+            ]
+        )
+        order = np.argsort(items, kind="stable")
+        items, ranks = items[order], np.cumsum(weights[order])
+        # the item below which a fraction q of the weight lies
+        positions = np.searchsorted(ranks, np.asarray(qs) * ranks[-1], side="left")
+        values = items[np.minimum(positions, items.size - 1)]
+        # the extremes are tracked exactly
+        values[np.asarray(qs) <= 0] = self.min
+        values[np.asarray(qs) >= 1] = self.max
+        return values
+
+
+def histogram_edges(values, dtype, bins=HISTOGRAM_BINS):
+    """
+    Edges of fixed bins spanning a sample, integers get a bin of their own
+    if the sample spans fewer values than there are bins
+    """
+    if values.size == 0:
+        return np.linspace(0.0, 1.0, bins + 1)
+    low, high = float(values.min()), float(values.max())
+    if np.issubdtype(dtype, np.integer) and high - low < bins:
+        return np.arange(low - 0.5, high + 1.5)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+class Distribution:
+    """
+    Mergeable histogram and quantile sketch of a stream of blocks
+
+    The histogram has fixed bins, the values outside of them are counted
+    separately. NaNs and infinities are only counted.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.nonfinite = 0
+        self.sketch = QuantileSketch()
+
+    @classmethod
+    def from_array(cls, data, edges):
+        dist = cls(edges)
+        values = np.asarray(data).ravel().astype(np.float64, copy=False)
+        finite = np.isfinite(values)
+        if not finite.all():
+            dist.nonfinite = int(values.size - np.count_nonzero(finite))
+            values = values[finite]
+        dist.counts = np.histogram(values, edges)[0]
+        dist.below = int(np.count_nonzero(values < edges[0]))
+        dist.above = int(np.count_nonzero(values > edges[-1]))
+        dist.sketch = QuantileSketch.from_array(values)
+        return dist
+
+    @property
+    def count(self):
+        return self.sketch.count + self.nonfinite
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        self.nonfinite += other.nonfinite
+        self.sketch.merge(other.sketch)
+        return self
+
+
+def field_values(block, field):
+    return block if field is None else block[field]
+
+
+def sample_blocks(data, blocks=SAMPLE_BLOCKS, sample_bytes=SAMPLE_BYTES):
+    """
+    Read blocks of rows picked at random from a dataset (or array)
+
+    Blocks are aligned to the chunks of the dataset, such that only the
+    sampled chunks are decompressed. Returns the rows read, and whether they
+    are the whole dataset.
+    """
+    if len(data.shape) == 0 or dataset_nbytes(data) <= sample_bytes:
+        return read_hyperslab(data), True
+    nrows = data.shape[0]
+    rows = block_rows(
+        data.shape,
+        data.dtype.itemsize,
+        getattr(data, "chunks", None),
+        sample_bytes // blocks,
+    )
+    starts = range(0, nrows, rows)
+    picked = np.random.choice(len(starts), min(blocks, len(starts)), replace=False)
+    parts = [
+        read_hyperslab(data, np.s_[starts[idx] : starts[idx] + rows])
+        for idx in np.sort(picked)
+    ]
+    return np.concatenate(parts), False
+
+
+def estimate_distribution(data, field=None):
+    """
+    Distribution of a random sample of a dataset, or of a field of a table
+
+    Returns the distribution and whether it covers all values.
+    """
+    sample, complete = sample_blocks(data)
+    values = field_values(sample, field)
+    dtype = values.dtype
+    values = np.asarray(values, dtype=np.float64).ravel()
+    edges = histogram_edges(values[np.isfinite(values)], dtype)
+    return Distribution.from_array(values, edges), complete
+
+
+def aggregate_distribution(
+    data, edges, field=None, progress=None, cancelled=None, workers=None
+):
+    """Distribution of all values of a dataset with fixed histogram bins"""
+    return aggregate_blocks(
+        data,
+        lambda block: Distribution.from_array(field_values(block, field), edges),
+        Distribution(edges),
+        progress=progress,
+        cancelled=cancelled,
+        workers=workers,
+    )
+
+
+def format_distribution(dist, width, bar="#"):
+    """Lines showing the quantiles and the histogram of a distribution"""
+    lines = ["Quantiles:"]
+    values = dist.sketch.quantiles(QUANTILES)
+    for q, value in zip(QUANTILES, values):
+        label = {0.0: "min", 1.0: "max"}.get(q, f"{100 * q:g}%")
+        lines.append(f"{label:>6}  {value:.6g}")
+
+    # the values outside of the bins, which span the sample, are shown in
+    # open ended bins at both ends
+    edges = dist.edges
+    if edges[0] % 1 == 0.5 and np.all(np.diff(edges) == 1):
+        # bins of single integers are labelled by their value
+        edges = edges + 0.5
+    rows = [(f"{edge:.4g}", count) for edge, count in zip(edges, dist.counts)]
+    if dist.below:
+        rows.insert(0, (f"<{dist.edges[0]:.4g}", dist.below))
+    if dist.above:
+        rows.append((f">{dist.edges[-1]:.4g}", dist.above))
+    label_width = max(len(label) for label, _ in rows)
+    bar_width = max(width - label_width - 9, 1)
+    counts = [count for _, count in rows]
+    total, peak = max(sum(counts), 1), max(max(counts), 1)
+
+    lines.extend(["", "Histogram:"])
+    for label, count in rows:
+        length = round(bar_width * count / peak)
+        lines.append(
+            f"{label:>{label_width}} {bar * length:<{bar_width}} "
+            f"{100 * count / total:5.1f}%"
+        )
+    if not dist.above:
+        lines.append(f"{'':>{label_width}} up to {dist.edges[-1]:.4g}")
+    if dist.nonfinite:
+        lines.append(f"{dist.nonfinite} NaN or infinite values")
+    return lines
@@ -0,0 +1,258 @@
+import argparse
+import os
+import sys
+
+import h5py
+import numpy as np
+import pandas as pd
+
+from h5tui.reader import (
+    decode_fields,
+    get_colnames,
+    iter_blocks,
+    open_dataset,
+    open_file,
+    read_hyperslab,
+)
+from h5tui.selection import DatasetView, SelectionError, parse_selection
+
+# output formats by file extension
+FORMATS = {
+    ".npy": "npy",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+# appended to the name of the output while it is being written
+PARTIAL_SUFFIX = ".partial"
+
+
+class ExportError(ValueError):
+    """Raised for datasets which cannot be written in the requested format"""
+
+
+def export_format(path):
+    """Output format selected by the extension of a file name"""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ExportError(
+            f"unknown output format, use one of {', '.join(sorted(FORMATS))}"
+        )
+    return fmt
+
+
+def plain_dtype(dtype):
+    """The dtype without the metadata h5py attaches to string and enum types"""
+    if dtype.names:
+        return np.dtype(
+            [(name, plain_dtype(dtype.fields[name][0])) for name in dtype.names]
+        )
+    if dtype.subdtype:
+        base, shape = dtype.subdtype
+        return np.dtype((plain_dtype(base), shape))
+    return np.dtype(dtype.str)
+
+
+def decode_strings(block):
+    """Decode the strings of a block of a plain array"""
+    if h5py.check_string_dtype(block.dtype) is None:
+        return block
+    return np.char.decode(block.astype(np.bytes_), "utf8", "replace")
+
+
+def table_columns(block):
+    """
+    Names and values of the columns of a block of rows
+
+    Strings are decoded as they are displayed. The columns of a compound
+    table are its fields, the elements of a row of a plain array become
+    columns named by their position.
+    """
+    if block.ndim == 0:
+        block = block.reshape(1)
+    if block.dtype.names:
+        block = decode_fields(block)
+        return [(name, block[name]) for name in get_colnames(block)]
+    block = decode_strings(block).reshape(len(block), int(np.prod(block.shape[1:])))
+    return [(str(i), block[:, i]) for i in range(block.shape[1])]
+
+
+def write_npy(data, path, blocks):
+    if data.dtype.hasobject or h5py.check_vlen_dtype(data.dtype) is not None:
+        raise ExportError(
+            "variable length data cannot be stored in .npy files, "
+            "export to .csv or .parquet instead"
+        )
+    dtype = plain_dtype(data.dtype)
+    # writes the header and sizes the file
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=data.shape)
+    if not data.shape:
+        output[()] = data[()]
+        output.flush()
+        yield
+        return
+    offset = output.offset
+    del output
+
+    # only the rows of the current block are mapped, which keeps the resident
+    # memory flat however large the file gets
+    nrows = data.shape[0]
+    row_nbytes = dtype.itemsize * int(np.prod(data.shape[1:]))
+    for selection in blocks:
+        start, stop, _ = selection.indices(nrows)
+        if stop > start:
+            output = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r+",
+                offset=offset + start * row_nbytes,
+                shape=(stop - start,) + data.shape[1:],
+            )
+            output[:] = read_hyperslab(data, selection)
+            output.flush()
+            del output
+        yield
+
+
+def write_csv(data, path, blocks):
+    # plain arrays are written without a header, like numpy.savetxt
+    header = bool(data.dtype.names)
+    with open(path, "w", newline="") as csv_file:
+        for selection in blocks:
+            columns = {}
+            for name, column in table_columns(read_hyperslab(data, selection)):
+                if column.ndim > 1:
+                    # subarray fields get a column per element
+                    column = column.reshape(len(column), -1)
+                    for i in range(column.shape[1]):
+                        columns[f"{name}[{i}]"] = column[:, i]
+                else:
+                    columns[name] = column
+            pd.DataFrame(columns).to_csv(csv_file, header=header, index=False)
+            header = False
+            yield
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError(
+            "writing .parquet and .arrow files requires pyarrow, "
+            "install it with `pip install pyarrow`"
+        ) from None
+    return pyarrow
+
+
+def arrow_table(pa, block):
+    """Arrow table of a block of rows, subarray fields become list columns"""
+    arrays, names = [], []
+    for name, column in table_columns(block):
+        if column.ndim > 1:
+            column = column.reshape(len(column), -1)
+            array = pa.FixedSizeListArray.from_arrays(
+                pa.array(column.ravel()), column.shape[1]
+            )
+        else:
+            array = pa.array(column)
+        arrays.append(array)
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_arrow(data, path, blocks, fmt):
+    pa = import_pyarrow()
+    writer = None
+    try:
+        for selection in blocks:
+            table = arrow_table(pa, read_hyperslab(data, selection))
+            if writer is None:
+                if fmt == "parquet":
+                    writer = pa.parquet.ParquetWriter(path, table.schema)
+                else:
+                    writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+            yield
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_data(data, path, progress=None, cancelled=None):
+    """
+    Write a dataset (or array, or selection) to a .npy, .csv, .parquet or
+    .arrow file, block by block
+
+    Only a block of rows is held in memory at a time, .npy files are filled
+    through a memory map of the rows of the block, which is read like any
+    other bulk read. Calls `progress(done, total)` after every block.
+    The output is written next to `path` and only replaces it once complete.
+    Returns False, and removes the partial output, if `cancelled()` turns
+    true before all blocks are written.
+    """
+    fmt = export_format(path)
+    # files are written in order, a block of rows after the other
+    total, blocks = iter_blocks(data, whole_rows=True)
+    if fmt != "npy" and data.shape and data.shape[0] == 0:
+        # the header or schema of an empty table
+        total, blocks = 1, iter([np.s_[0:0]])
+
+    # an existing file at `path` is kept if the export fails or is cancelled
+    partial = path + PARTIAL_SUFFIX
+    if fmt == "npy":
+        writer = write_npy(data, partial, blocks)
+    elif fmt == "csv":
+        writer = write_csv(data, partial, blocks)
+    else:
+        writer = write_arrow(data, partial, blocks, fmt)
+    complete = False
+    try:
+        for done, _ in enumerate(writer, start=1):
+            if progress is not None:
+                progress(done, total)
+            if cancelled is not None and cancelled():
+                return False
+        complete = True
+    finally:
+        writer.close()
+        if not complete and os.path.exists(partial):
+            os.remove(partial)
+    os.replace(partial, path)
+    return True
+
+
+def export(argv):
+    """Entry point of `h5tui export`"""
+    parser = argparse.ArgumentParser(
+        prog="h5tui export",
+        description="Write a dataset, or a selection of it, to a .npy, .csv, "
+        ".parquet or .arrow file, the format is chosen by the extension",
+    )
+    parser.add_argument("file", help="HDF5 file")
+    parser.add_argument("dataset", help="path of the dataset in the file")
+    parser.add_argument("output", help="output file")
+    parser.add_argument(
+        "--select",
+        default="",
+        metavar="EXPR",
+        help="selection expression, e.g. '[100:200, ::10]' or \"['x', 'y']\"",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="overwrite an existing output file"
+    )
+    args = parser.parse_args(argv)
+    if os.path.exists(args.output) and not args.force:
+        parser.error(f"{args.output} exists, use --force to overwrite it")
+
+    with open_file(args.file) as h5file:
+        if not isinstance(h5file.get(args.dataset), h5py.Dataset):
+            parser.error(f"{args.dataset} is not a dataset of {args.file}")
+        dset = open_dataset(h5file, args.dataset)
+        try:
+            indices, fields = parse_selection(args.select)
+            data = DatasetView(dset, indices, fields) if indices or fields else dset
+            export_data(data, args.output)
+        except (SelectionError, ExportError) as err:
+            sys.exit(f"h5tui export: error: {err}")
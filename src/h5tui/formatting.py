@@ -0,0 +1,152 @@
+import numpy as np
+
+from h5tui.reader import read_hyperslab
+
+# lines at the start, middle and end of an array which are formatted to
+# estimate the width of its elements
+SAMPLE_LINES = 32
+# elements at both ends of a line which are part of the sample
+SAMPLE_COLUMNS = 32
+
+
+def line_shape(shape):
+    """
+    Number of lines and of elements per line of the text view of an array
+
+    Every element of a 1D array gets its own line, higher dimensional arrays
+    get a line per vector along their last axis (0 elements per line stands
+    for a single element without brackets).
+    """
+    if len(shape) <= 1:
+        return (shape[0] if shape else 1), 0
+    return int(np.prod(shape[:-1])), shape[-1]
+
+
+def line_label(shape, line):
+    """Index of a line, e.g. `3` or `3, 4` for the line data[3, 4, :]"""
+    if len(shape) <= 2:
+        return str(line)
+    return ", ".join(str(int(i)) for i in np.unravel_index(line, shape[:-1]))
+
+
+def read_lines(data, start, stop, pager=None):
+    """
+    Read the lines `start` to `stop` of the text view of an array
+
+    Returns the elements of the lines as an array of one dimension (one
+    element per line) or two dimensions (one row per line). 1D and 2D data is
+    read through its pager if it has one.
+    """
+    shape = data.shape
+    if not shape:
+        return np.asarray(read_hyperslab(data)).reshape(1)
+    if len(shape) <= 2:
+        if pager is not None:
+            return pager.window(start, stop)
+        return read_hyperslab(data, np.s_[start:stop])
+
+    # lines of higher dimensional data are read per matrix of the last two axes
+    rows = shape[-2]
+    parts = []
+    line = start
+    while line < stop:
+        matrix, offset = divmod(line, rows)
+        end = min(stop, (matrix + 1) * rows)
+        prefix = tuple(int(i) for i in np.unravel_index(matrix, shape[:-2]))
+        parts.append(
+            read_hyperslab(data, prefix + (slice(offset, offset + end - line),))
+        )
+        line = end
+    if not parts:
+        return np.empty((0, shape[-1]), dtype=data.dtype)
+    return np.concatenate(parts)
+
+
+def sample_lines(data, pager=None):
+    """Elements of the leading, middle and trailing lines of an array"""
+    nlines, ncols = line_shape(data.shape)
+    if nlines == 0:
+        return np.empty(0, dtype=data.dtype)
+    starts = {0, max(nlines // 2 - SAMPLE_LINES // 2, 0), max(nlines - SAMPLE_LINES, 0)}
+    parts = []
+    for start in sorted(starts):
+        lines = read_lines(data, start, min(start + SAMPLE_LINES, nlines), pager)
+        if lines.ndim == 2 and ncols > 2 * SAMPLE_COLUMNS:
+            lines = np.concatenate(
+                [lines[:, :SAMPLE_COLUMNS], lines[:, -SAMPLE_COLUMNS:]], axis=1
+            )
+        parts.append(lines.ravel())
+    return np.concatenate(parts)
+
+
+class ElementFormatter:
+    """
+    Formats single elements of an array consistently, following numpy
+
+    Whether floats are printed in scientific notation is decided once from a
+    sample of the array, and they get as many decimals as the most precise
+    element formatted so far, such that elements formatted independently line
+    up. Also estimates the width of a column from the sample.
+    """
+
+    def __init__(self, sample, precision=8, suppress=False):
+        sample = np.asarray(sample)
+        self.kind = sample.dtype.kind
+        self._precision = precision
+        self._scientific = False
+        self._decimals = 0
+        if self.kind == "f" and sample.size:
+            self._choose_notation(sample, suppress)
+        self.width = max((len(self(value)) for value in sample), default=1)
+
+    def _choose_notation(self, sample, suppress):
+        # the same rule as numpy's FloatingFormat
+        finite = np.abs(sample[np.isfinite(sample)])
+        nonzero = finite[finite > 0]
+        if nonzero.size and not suppress:
+            largest, smallest = nonzero.max(), nonzero.min()
+            self._scientific = (
+                largest >= 1e8 or smallest < 1e-4 or largest / smallest > 1e3
+            )
+        # as many digits as the most precise element needs
+        if self._scientific:
+            digits = (
+                np.format_float_scientific(
+                    value, precision=self._precision, unique=True, trim="-"
+                ).partition("e")[0]
+                for value in finite
+            )
+        else:
+            digits = (
+                np.format_float_positional(
+                    value, precision=self._precision, unique=True, trim="-"
+                )
+                for value in finite
+            )
+        self._decimals = max(
+            (len(text.partition(".")[2]) for text in digits), default=0
+        )
+
+    def __call__(self, value):
+        if self.kind == "f":
+            if not np.isfinite(value):
+                return str(value)
+            if self._scientific:
+                mantissa, _, exponent = np.format_float_scientific(
+                    value, precision=self._precision, unique=True, trim="-"
+                ).partition("e")
+            else:
+                mantissa, exponent = (
+                    np.format_float_positional(
+                        value, precision=self._precision, unique=True, trim="-"
+                    ),
+                    "",
+                )
+            whole, _, decimals = mantissa.partition(".")
+            # elements missed by the sample may need more decimals
+            self._decimals = max(self._decimals, len(decimals))
+            text = f"{whole}.{decimals.ljust(self._decimals, '0')}"
+            return f"{text}e{exponent}" if exponent else text
+        if self.kind == "b":
+            return str(bool(value))
+        return str(value)
@@ -1,22 +1,121 @@
+from textual import work
 from textual.app import App, ComposeResult
-from textual.widgets import Footer, Header, OptionList, Static, DataTable
+from textual.widgets import Footer, Header, Input, OptionList, Static, ProgressBar
 from textual.containers import VerticalScroll, Horizontal, Container, Vertical
 from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.screen import ModalScreen
+from textual.worker import get_current_worker
 from textual_plotext import PlotextPlot
+from rich.segment import Segment
 
 import h5py
 import numpy as np
 import pandas as pd
 
+from h5tui.aggregate import RunningStats, aggregate_stats, is_aggregatable
+from h5tui.batch import summary
+from h5tui.compare import compare_files, diff, format_diff, join_path
+from h5tui.distribution import (
+    Distribution,
+    aggregate_distribution,
+    distribution_fields,
+    estimate_distribution,
+    field_values,
+    format_distribution,
+)
+from h5tui.export import ExportError, export, export_data
+from h5tui.formatting import (
+    ElementFormatter,
+    line_label,
+    line_shape,
+    read_lines,
+    sample_lines,
+)
+from h5tui.index import StructureIndex, file_key
+from h5tui.links import ExternalFiles, LinkError, describe_sources, resolve_link
+from h5tui.metadata import (
+    DATASET,
+    DATATYPE,
+    EXTERNAL_LINK,
+    GROUP,
+    LINK_KINDS,
+    SOFT_LINK,
+    USER_LINK,
+    ListingCache,
+    item_info,
+)
+from h5tui.plotting import (
+    PREVIEW_POINTS,
+    SqueezedData,
+    decimate_1d,
+    decimate_2d,
+    reduction_factors,
+)
+from h5tui.profiling import (
+    enable_profiling,
+    format_totals,
+    get_profiler,
+    span,
+    traced,
+)
+from h5tui.reader import (
+    FILE_DRIVERS,
+    DatasetPager,
+    PrefetchCache,
+    decode_fields,
+    get_colnames,
+    needs_paging,
+    open_dataset,
+    open_file,
+    read_hyperslab,
+)
+from h5tui.search import SearchIndex
+from h5tui.selection import DatasetView, SelectionError, parse_selection
+
+from collections import OrderedDict
+from multiprocessing import resource_tracker
+import json
 import sys
 import os
+import posixpath
+import time
 import argparse
 
 UNICODE_SUPPORT = sys.stdout.encoding.lower().startswith("utf")
 
+# interval at which the event loop is checked for stalls when profiling
+PROFILE_TICK = 0.1
+
+# column widths of tables are estimated from their leading and trailing rows
+TABLE_SAMPLE_ROWS = 100
+TABLE_MAX_COLUMN_WIDTH = 40
+
+# datasets around the highlighted one which are read ahead, once the cursor
+# rested for PREFETCH_DELAY seconds
+PREFETCH_NEIGHBOURS = 2
+PREFETCH_DELAY = 0.15
+# elements of a dataset shown in the preview pane
+PREVIEW_SAMPLE_ELEMENTS = 8
+# upper bound on the memory held by the attribute values read by a popup
+ATTR_CACHE_BYTES = 64 << 20
+# objects which could not be compared listed in the notification
+COMPARE_ERRORS_SHOWN = 3
+
 
 class AttributeScreen(ModalScreen):
+    """
+    Attributes of an object, read on a thread worker as they are highlighted
+
+    The values read are cached for the lifetime of the screen, up to
+    ATTR_CACHE_BYTES. Arrays are displayed line by line like datasets, and
+    text (e.g. serialized JSON) is only laid out for the lines on screen.
+    """
+
     BINDINGS = [
         Binding(
             "left,h,q",
@@ -31,6 +130,8 @@ class AttributeScreen(ModalScreen):
         Binding("K", "scroll_content_up", "Scroll Up", priority=True),
         Binding("u", "scroll_content_page_up", "Scroll Down", priority=True),
         Binding("d", "scroll_content_page_down", "Scroll Up", priority=True),
+        Binding("L", "scroll_content_right", "Scroll right", show=False),
+        Binding("H", "scroll_content_left", "Scroll left", show=False),
     ]
 
     def __init__(self, h5file, cur_dir, itemname, id=None) -> None:
@@ -38,33 +139,98 @@ class AttributeScreen(ModalScreen):
         self._file = h5file
         self._cur_dir = cur_dir
         self._itemname = itemname
-        self._item = self._file[self._cur_dir + f"/{self._itemname}"]
+        self._item = self._file[posixpath.join(self._cur_dir, self._itemname)]
+        # only the names are read until an attribute is highlighted
         self._attrs = list(self._item.attrs.keys())
-
-        self._cur_attr = self._attrs[0]
+        self._cur_attr = self._attrs[0] if self._attrs else None
+        # values read so far, least recently displayed first
+        self._values = OrderedDict()
+        self._values_nbytes = 0
 
         self._selector_widget = MyOptionList(*self._attrs, markup=False)
         self._selector_widget.border_title = f"Attributes for {self._itemname}"
 
-        self._content_widget = Static(id="attr_content", markup=False)
-        self._vertical_widget = VerticalScroll(
-            self._content_widget, id="attr_content_scroll"
+        self._text_widget = TextLines(id="attr_text")
+        self._array_widget = ArrayLines(id="attr_array")
+        self._content_widget = Vertical(
+            self._text_widget, self._array_widget, id="attr_content"
         )
 
-        self.update_content()
-
     def compose(self) -> ComposeResult:
         with Vertical(id="dialog"):
             yield self._selector_widget
-            yield self._vertical_widget
+            yield self._content_widget
         yield Footer()
 
+    def on_mount(self):
+        self._array_widget.display = False
+        self.update_content()
+
     def update_content(self):
-        content = str(self._item.attrs[self._cur_attr])
-        print(f"{content = }")
-        self._content_widget.update(content)
+        """Display the highlighted attribute, reading it if it is not cached"""
+        name = self._cur_attr
+        if name is None:
+            return
+        attr = self._item.attrs.get_id(name)
+        self._content_widget.border_title = f"{name} <{attr.dtype}> {attr.shape}"
+        self._content_widget.border_subtitle = ""
+        if name in self._values:
+            self._values.move_to_end(name)
+            self.show_value(name, self._values[name])
+        else:
+            self._content_widget.loading = True
+            self.load_attr(name)
+
+    @work(thread=True, exclusive=True, group="attr")
+    def load_attr(self, name):
+        worker = get_current_worker()
+        with span("read attribute", "io"):
+            try:
+                value = self._item.attrs[name]
+            except (OSError, TypeError, ValueError) as err:
+                value = f"Cannot read the attribute: {err}"
+        if not is_array_attr(value):
+            # the text is cached rather than the value, e.g. parsed JSON
+            with span("format attribute", "format"):
+                value = attr_text(value)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.cache_value, name, value)
+
+    def cache_value(self, name, value):
+        self._values[name] = value
+        self._values_nbytes += attr_nbytes(value)
+        while self._values_nbytes > ATTR_CACHE_BYTES and len(self._values) > 1:
+            _, evicted = self._values.popitem(last=False)
+            self._values_nbytes -= attr_nbytes(evicted)
+        if name == self._cur_attr:
+            self.show_value(name, value)
+
+    def show_value(self, name, value):
+        self._content_widget.loading = False
+        is_array = is_array_attr(value)
+        self._text_widget.display = not is_array
+        self._array_widget.display = is_array
+        if is_array:
+            self._text_widget.update("")
+            self._array_widget.loading = True
+            self._array_widget.update(value, printoptions=np.get_printoptions())
+        else:
+            self._array_widget.clear()
+            self._text_widget.update(value)
+
+    def on_array_lines_viewport_changed(self, event):
+        event.stop()
+        self._content_widget.border_subtitle = (
+            f"rows {event.first}-{event.last} of {event.total}"
+        )
+
+    def content_view(self):
+        if self._array_widget.display:
+            return self._array_widget
+        return self._text_widget
 
     def action_quit_attrs(self):
+        self.workers.cancel_node(self)
         self.app.pop_screen()
 
     def action_cursor_down(self):
@@ -82,25 +248,252 @@ class AttributeScreen(ModalScreen):
             self.update_content()
 
     def action_scroll_content_down(self):
-        print("scrolling down")
-        self._vertical_widget.scroll_down()
+        self.content_view().scroll_down(animate=False)
 
     def action_scroll_content_up(self):
-        print("scrolling up")
-        self._vertical_widget.scroll_up()
+        self.content_view().scroll_up(animate=False)
 
     def action_scroll_content_page_down(self):
-        print("scrolling DOWN")
-        self._vertical_widget.scroll_page_down()
+        self.content_view().scroll_page_down(animate=False)
 
     def action_scroll_content_page_up(self):
-        print("scrolling UP")
-        self._vertical_widget.scroll_page_up()
+        self.content_view().scroll_page_up(animate=False)
+
+    def action_scroll_content_right(self):
+        if self._array_widget.display:
+            self._array_widget.action_scroll_right()
+
+    def action_scroll_content_left(self):
+        if self._array_widget.display:
+            self._array_widget.action_scroll_left()
+
+
+def is_array_attr(value):
+    """Checks if an attribute is displayed like a dataset"""
+    return isinstance(value, np.ndarray) and value.ndim > 0 and value.size > 0
+
+
+def attr_nbytes(value):
+    """Approximate memory held by the value of an attribute"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 0
+
+
+def attr_text(value):
+    """Text of a scalar attribute, serialized JSON is indented"""
+    if isinstance(value, bytes):
+        value = value.decode("utf8", "replace")
+    if not isinstance(value, str):
+        return str(value)
+    if value.lstrip().startswith(("{", "[")):
+        try:
+            return json.dumps(json.loads(value), indent=2, ensure_ascii=False)
+        except ValueError:
+            pass
+    return value
+
+
+class TextLines(ScrollView):
+    """
+    Text view which only renders the rows on screen
+
+    Lines longer than the view are wrapped. The first row of every line is
+    kept as a cumulative sum, from which the line of a visible row is found
+    by bisection, such that megabytes of text are displayed without laying
+    all of it out.
+    """
+
+    DEFAULT_CSS = """
+    TextLines {
+        height: auto;
+        max-height: 100%;
+        background: $panel;
+    }
+    """
+
+    def __init__(self, id=None):
+        super().__init__(id=id)
+        self._lines = [""]
+        self._width = 1
+        # first row of every line, followed by the number of rows
+        self._starts = np.zeros(2, dtype=np.int64)
+
+    def update(self, text):
+        self._lines = text.expandtabs().splitlines() or [""]
+        self.wrap_lines()
+        self.scroll_to(0, 0, animate=False, force=True, immediate=True)
+
+    def wrap_lines(self):
+        if not self.scrollable_content_region.width:
+            # hidden, laid out once it is displayed
+            return
+        self._width = self.scrollable_content_region.width
+        lengths = np.fromiter(map(len, self._lines), np.int64, len(self._lines))
+        rows = np.maximum(-(-lengths // self._width), 1)
+        self._starts = np.concatenate([[0], np.cumsum(rows)])
+        self.virtual_size = Size(self._width, int(self._starts[-1]))
+        self.refresh()
+
+    def on_resize(self):
+        self.wrap_lines()
+
+    def render_line(self, y):
+        width = self.scrollable_content_region.width
+        style = self.rich_style
+        if width != self._width:
+            # resized, or a scrollbar appeared
+            self.call_after_refresh(self.wrap_lines)
+        row = round(self.scroll_offset.y) + y
+        if row >= self._starts[-1]:
+            return Strip.blank(width, style)
+        line = int(np.searchsorted(self._starts, row, side="right")) - 1
+        start = int(row - self._starts[line]) * self._width
+        text = self._lines[line][start : start + self._width]
+        return Strip([Segment(text, style)]).crop_extend(0, width, style)
+
+
+class SearchScreen(ModalScreen):
+    """Dialog to search the paths and attributes of all objects of the file"""
 
+    BINDINGS = [
+        Binding("escape", "quit_search", "Return", show=True, priority=True),
+        Binding("down", "cursor_down", "Down", show=True, priority=True),
+        Binding("up", "cursor_up", "Up", show=True, priority=True),
+        Binding("enter", "select", "Go to", show=True, priority=True),
+    ]
+
+    def __init__(self, id=None) -> None:
+        super().__init__(id=id)
+        self._hits = []
+        self._input_widget = Input(placeholder="Search paths and attributes")
+        self._results_widget = MyOptionList(id="search_results", markup=False)
+        self._results_widget.can_focus = False
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="dialog"):
+            yield self._input_widget
+            yield self._results_widget
+        yield Footer()
+
+    def on_mount(self):
+        self._input_widget.focus()
+        self.refresh_results()
+
+    def on_input_changed(self, event):
+        self.refresh_results()
+
+    def refresh_results(self):
+        """Query the search index of the app, or wait for it to be built"""
+        if self.app.search_index is None:
+            self._results_widget.border_title = "Indexing the file..."
+        else:
+            self.run_query(self.app.search_index, self._input_widget.value)
+
+    @work(thread=True, exclusive=True, group="search")
+    def run_query(self, index, query):
+        worker = get_current_worker()
+        hits = index.search(query)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.show_results, hits)
+
+    def show_results(self, hits):
+        self._hits = hits
+        self._results_widget.border_title = f"{len(hits)} results"
+        self._results_widget.clear_options()
+        self._results_widget.add_options([str(hit) for hit in hits])
+        if hits:
+            self._results_widget.highlighted = 0
+
+    def action_quit_search(self):
+        self.dismiss(None)
+
+    def action_cursor_down(self):
+        self._results_widget.action_cursor_down()
+
+    def action_cursor_up(self):
+        self._results_widget.action_cursor_up()
+
+    def action_select(self):
+        highlighted = self._results_widget.highlighted
+        if highlighted is not None and highlighted < len(self._hits):
+            self.dismiss(self._hits[highlighted])
+
+    def on_option_list_option_selected(self, event):
+        self.dismiss(self._hits[event.option_index])
+
+
+class SelectionScreen(ModalScreen):
+    """Prompt for a selection expression applied to the displayed dataset"""
+
+    BINDINGS = [
+        Binding("escape", "quit_selection", "Return", show=True, priority=True),
+    ]
+
+    def __init__(self, shape, dtype, selection="", id=None) -> None:
+        super().__init__(id=id)
+        self._input_widget = Input(
+            value=selection, placeholder="e.g. [100:200, ::10, 5] or ['x', 'y']"
+        )
+        names = f" fields {', '.join(dtype.names)}" if dtype.names else ""
+        self._input_widget.border_title = f"Select from {shape}{names}"
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="selection_dialog"):
+            yield self._input_widget
+        yield Footer()
+
+    def on_mount(self):
+        self._input_widget.focus()
+
+    def on_input_submitted(self, event):
+        self.dismiss(event.value)
+
+    def action_quit_selection(self):
+        self.dismiss(None)
+
+
+class ExportScreen(ModalScreen):
+    """Prompt for the file the displayed dataset is exported to"""
+
+    BINDINGS = [
+        Binding("escape", "quit_export", "Return", show=True, priority=True),
+    ]
+
+    def __init__(self, fname, id=None) -> None:
+        super().__init__(id=id)
+        self._input_widget = Input(value=fname, placeholder="e.g. data.npy")
+        self._input_widget.border_title = "Export to (.npy, .csv, .parquet, .arrow)"
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="selection_dialog"):
+            yield self._input_widget
+        yield Footer()
+
+    def on_mount(self):
+        self._input_widget.focus()
+
+    def on_input_submitted(self, event):
+        self.dismiss(event.value)
+
+    def action_quit_export(self):
+        self.dismiss(None)
+
+
+class MyDataTable(ScrollView, can_focus=True):
+    """
+    Table of a compound dataset which only reads the rows on screen
+
+    Rows are read in blocks through a DatasetPager as the cursor moves, and
+    the string fields of each block are decoded at once when it is read.
+    Only a bounded number of blocks is kept in memory. Rows of blocks which
+    are not read yet are drawn as placeholders until a thread worker has
+    read them.
+    """
 
-class MyDataTable(DataTable):
     BINDINGS = [
-        Binding("enter", "select_cursor", "Select", show=False),
         Binding("up,k", "cursor_up", "Cursor up", show=False),
         Binding("down,j", "cursor_down", "Cursor down", show=False),
         Binding("right,L", "cursor_right", "Cursor right", show=False),
@@ -111,22 +504,502 @@ class MyDataTable(DataTable):
         Binding("G", "scroll_bottom", "Bottom", show=False),
     ]
 
+    COMPONENT_CLASSES = {"datatable--header", "datatable--cursor"}
+
+    DEFAULT_CSS = """
+    MyDataTable {
+        background: $surface;
+        color: $foreground;
+        height: auto;
+        max-height: 100%;
+        & > .datatable--header {
+            text-style: bold;
+            background: $panel;
+            color: $foreground;
+        }
+        & > .datatable--cursor {
+            background: $block-cursor-blurred-background;
+        }
+        &:focus {
+            background-tint: $foreground 5%;
+            & > .datatable--cursor {
+                background: $block-cursor-background;
+                color: $block-cursor-foreground;
+                text-style: $block-cursor-text-style;
+            }
+        }
+    }
+    """
+
+    class ColumnHighlighted(Message):
+        """Posted when the cursor moves to another column"""
+
+        def __init__(self, name):
+            super().__init__()
+            self.name = name
+
     def __init__(self, id):
         super().__init__(id=id)
+        self._pager = None
+        self._names = ()
+        self._widths = []
+        self._pending = None
+        self.cursor_row = 0
+        self.cursor_column = 0
+
+    @property
+    def row_count(self):
+        return 0 if self._pager is None else self._pager.nrows
+
+    @staticmethod
+    def create_pager(value, height):
+        """Pager reading the rows of a table in blocks of at least `height`"""
+        return DatasetPager(
+            value, page_len=max(height, TABLE_SAMPLE_ROWS), transform=decode_fields
+        )
 
-    def update(self, value):
-        self.clear(columns=True)
-        self.add_columns(*get_colnames(value))
-        for row in value:
-            row_cleaned = [
-                e.decode("utf8") if isinstance(e, bytes) else e for e in row.item()
+    def update(self, value, pager=None):
+        """Display a recarray or compound dataset, reading only its first rows"""
+        self.workers.cancel_node(self)
+        pager = pager or self.create_pager(value, self.app.size.height)
+        if pager is not self._pager:
+            # nothing is drawn until the column widths are known
+            self._widths = []
+        self._pager = pager
+        self._pending = None
+        self._names = get_colnames(value)
+        self.cursor_row = 0
+        self.cursor_column = 0
+        if not self._widths:
+            if isinstance(pager.dataset, np.ndarray):
+                self.set_widths(pager, self.read_sample(pager))
+            else:
+                self.load_sample(pager)
+        self.resize_table()
+        self.scroll_to(0, 0, animate=False)
+
+    @staticmethod
+    def read_sample(pager):
+        """The leading and trailing rows, which column widths are estimated from"""
+        nrows = pager.nrows
+        return np.concatenate(
+            [
+                pager.window(0, TABLE_SAMPLE_ROWS),
+                pager.window(max(nrows - TABLE_SAMPLE_ROWS, TABLE_SAMPLE_ROWS), nrows),
             ]
-            self.add_row(*row_cleaned)
+        )
 
+    @work(thread=True, exclusive=True, group="sample")
+    def load_sample(self, pager):
+        worker = get_current_worker()
+        sample = self.read_sample(pager)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.set_widths, pager, sample)
 
-def get_colnames(obj):
-    """Return the column names of numpy recarray"""
-    return obj.dtype.names
+    def set_widths(self, pager, sample):
+        if pager is not self._pager:
+            return
+        self._widths = [
+            min(
+                max([len(name)] + [len(format_cell(cell)) for cell in sample[name]]),
+                TABLE_MAX_COLUMN_WIDTH,
+            )
+            for name in self._names
+        ]
+        self.resize_table()
+
+    def resize_table(self):
+        self.virtual_size = Size(
+            sum(width + 2 for width in self._widths), self.row_count + 1
+        )
+        self.refresh()
+
+    def extend(self, nrows):
+        """Show the rows appended to the table after its first `nrows` rows"""
+        self._pager.invalidate(nrows)
+        self._pending = None
+        self.resize_table()
+        if self.cursor_row == nrows - 1:
+            self.move_cursor(row=self.row_count - 1)
+
+    def render_line(self, y):
+        width = self.scrollable_content_region.width
+        scroll_x, scroll_y = round(self.scroll_offset.x), round(self.scroll_offset.y)
+        base_style = self.rich_style
+
+        if y == 0:
+            # the header stays on top when scrolling vertically
+            header_style = self.get_component_rich_style("datatable--header")
+            cells = self._names
+            styles = [header_style] * len(cells)
+        else:
+            row = scroll_y + y - 1
+            if row >= self.row_count:
+                return Strip.blank(width, base_style)
+            record = self.get_record(row)
+            if record is None:
+                cells = ["…" if UNICODE_SUPPORT else "..."] * len(self._names)
+            else:
+                cells = [format_cell(record[name]) for name in self._names]
+            styles = [base_style] * len(cells)
+            if row == self.cursor_row and cells:
+                styles[self.cursor_column] = self.get_component_rich_style(
+                    "datatable--cursor"
+                )
+
+        segments = [
+            Segment(f" {fit_cell(cell, cell_width)} ", style)
+            for cell, cell_width, style in zip(cells, self._widths, styles)
+        ]
+        return Strip(segments).crop_extend(scroll_x, scroll_x + width, base_style)
+
+    def get_record(self, row):
+        """A row of the table, or None until the rows on screen have been read"""
+        if isinstance(self._pager.dataset, np.ndarray):
+            return self._pager.window(row, row + 1)[0]
+        rows = self._pager.cached_window(row, row + 1)
+        if rows is not None and len(rows):
+            return rows[0]
+        start = round(self.scroll_offset.y)
+        stop = start + max(self.scrollable_content_region.height - 1, 1)
+        if self._pending != (start, stop):
+            self._pending = (start, stop)
+            self.fetch_rows(self._pager, start, stop)
+        return None
+
+    @work(thread=True, exclusive=True, group="rows")
+    def fetch_rows(self, pager, start, stop):
+        worker = get_current_worker()
+        pager.window(start, stop)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.show_rows, pager)
+
+    def show_rows(self, pager):
+        if pager is self._pager:
+            self._pending = None
+            self.refresh()
+
+    def move_cursor(self, row=None, column=None):
+        """Move the cursor and scroll such that it stays visible"""
+        if self.row_count == 0 or not self._widths:
+            # the columns are laid out once the sample of the table is read
+            return
+        if row is not None:
+            self.cursor_row = min(max(row, 0), self.row_count - 1)
+        if column is not None:
+            previous = self.cursor_column
+            self.cursor_column = min(max(column, 0), len(self._names) - 1)
+            if self.cursor_column != previous:
+                self.post_message(self.ColumnHighlighted(self.highlighted_name()))
+
+        height = max(self.scrollable_content_region.height - 1, 1)
+        top = round(self.scroll_offset.y)
+        if self.cursor_row < top:
+            top = self.cursor_row
+        elif self.cursor_row >= top + height:
+            top = self.cursor_row - height + 1
+
+        width = self.scrollable_content_region.width
+        left = round(self.scroll_offset.x)
+        start = sum(w + 2 for w in self._widths[: self.cursor_column])
+        end = start + self._widths[self.cursor_column] + 2
+        if start < left:
+            left = start
+        elif end > left + width:
+            left = end - width
+
+        self.scroll_to(left, top, animate=False)
+        self.refresh()
+
+    def on_click(self, event):
+        offset = event.get_content_offset(self)
+        if offset is None or offset.y == 0:
+            return
+        x = round(self.scroll_offset.x) + offset.x
+        column = 0
+        for column, cell_width in enumerate(self._widths):
+            x -= cell_width + 2
+            if x < 0:
+                break
+        self.move_cursor(round(self.scroll_offset.y) + offset.y - 1, column)
+
+    def highlighted_name(self):
+        """Name of the column of the cursor"""
+        return self._names[self.cursor_column] if self._names else None
+
+    def action_cursor_up(self):
+        self.move_cursor(row=self.cursor_row - 1)
+
+    def action_cursor_down(self):
+        self.move_cursor(row=self.cursor_row + 1)
+
+    def action_cursor_left(self):
+        self.move_cursor(column=self.cursor_column - 1)
+
+    def action_cursor_right(self):
+        self.move_cursor(column=self.cursor_column + 1)
+
+    def action_page_up(self):
+        height = max(self.scrollable_content_region.height - 1, 1)
+        self.move_cursor(row=self.cursor_row - height)
+
+    def action_page_down(self):
+        height = max(self.scrollable_content_region.height - 1, 1)
+        self.move_cursor(row=self.cursor_row + height)
+
+    def action_scroll_top(self):
+        self.move_cursor(row=0)
+
+    def action_scroll_bottom(self):
+        self.move_cursor(row=self.row_count - 1)
+
+
+class ArrayLines(ScrollView):
+    """
+    Text view of an array which only formats the lines on screen
+
+    Every line shows an element of a 1D array, or the elements along the last
+    axis of higher dimensional arrays. The lines around the visible ones are
+    read in a block on a thread worker, and elements are formatted one by one
+    such that the notation and width of the columns is decided from a sample.
+    With truncation, lines of large arrays only show their first and last
+    elements, otherwise they are scrolled horizontally.
+    """
+
+    DEFAULT_CSS = """
+    ArrayLines {
+        height: auto;
+        max-height: 100%;
+        background: $panel;
+    }
+    """
+
+    class ViewportChanged(Message):
+        """Posted when the visible lines change"""
+
+        def __init__(self, first, last, total):
+            super().__init__()
+            self.first = first
+            self.last = last
+            self.total = total
+
+    def __init__(self, id):
+        super().__init__(id=id)
+        self._data = None
+        self._pager = None
+        self._nlines = 0
+        self._ncols = 0
+        self._sample = None
+        self._formatter = None
+        self._justify = str.rjust
+        self._cell_width = 1
+        self._label_width = 0
+        self._summarize = False
+        self._edgeitems = 3
+        self._block_start = 0
+        self._block = None
+        self._pending = None
+        # whether the last line is displayed
+        self._tail = False
+
+    def clear(self):
+        """Stop displaying (and reading) the current array"""
+        self.workers.cancel_node(self)
+        self._data = self._pager = self._formatter = self._block = None
+        self._pending = None
+        self.virtual_size = Size(0, 0)
+        self.refresh()
+
+    def update(self, data, pager=None, printoptions=None):
+        """Display an array or dataset, with a pager over it for large datasets"""
+        self.clear()
+        self._data = data
+        self._pager = pager
+        self._nlines, self._ncols = line_shape(data.shape)
+        self.scroll_to(0, 0, animate=False, force=True, immediate=True)
+        # threads do not inherit the numpy print options of the event loop
+        self.load(data, pager, printoptions or np.get_printoptions())
+
+    def extend(self, data, pager=None):
+        """Display the grown version of the array, e.g. when following a file"""
+        if self._formatter is None:
+            # still reading the sample of the array
+            self.update(data, pager)
+            return
+        nlines = self._nlines
+        self._data = data
+        self._pager = pager
+        self._nlines, self._ncols = line_shape(data.shape)
+        if self._block is not None and self._block_start + len(self._block) >= nlines:
+            # the block may end with lines which were only partially read
+            self._block = None
+        self._pending = None
+        self.resize_lines()
+        if self._tail:
+            # keep showing the last lines, like tail -f
+            self.scroll_end(animate=False)
+        self.post_viewport()
+
+    @work(thread=True, exclusive=True, group="lines")
+    def load(self, data, pager, printoptions):
+        """Read a sample and the first lines of an array on a thread worker"""
+        worker = get_current_worker()
+        with span("sample", "format"):
+            sample = sample_lines(data, pager)
+        block = read_lines(data, 0, min(self.block_lines(), self._nlines), pager)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.show, data, sample, block, printoptions)
+
+    def show(self, data, sample, block, printoptions):
+        if data is not self._data:
+            return
+        self._sample = sample
+        self._block_start, self._block = 0, block
+        self.loading = False
+        self.set_options(printoptions)
+
+    def set_options(self, printoptions):
+        """Format the displayed array with other numpy print options"""
+        if self._sample is None:
+            return
+        with span("formatter", "format"):
+            self._formatter = ElementFormatter(
+                self._sample, printoptions["precision"], printoptions["suppress"]
+            )
+        self._justify = str.rjust if self._formatter.kind in "biufc" else str.ljust
+        self._cell_width = self._formatter.width
+        self._summarize = (
+            self._data.size > printoptions["threshold"]
+            and self._ncols > 2 * printoptions["edgeitems"] + 1
+        )
+        self._edgeitems = printoptions["edgeitems"]
+        self._label_width = (
+            max(len(line_label(self._data.shape, self._nlines - 1)), 1)
+            if self._data.shape
+            else 0
+        )
+        self.resize_lines()
+        self.post_viewport()
+
+    def resize_lines(self):
+        cells = 2 * self._edgeitems + 1 if self._summarize else max(self._ncols, 1)
+        self.virtual_size = Size(
+            self.label_width() + cells * (self._cell_width + 1), self._nlines
+        )
+        self.refresh()
+
+    def label_width(self):
+        return self._label_width + 2 if self._label_width else 0
+
+    def block_lines(self):
+        """Number of lines read at once, a few screens"""
+        return 3 * max(self.app.size.height, 1)
+
+    def watch_scroll_y(self, old_value, new_value):
+        super().watch_scroll_y(old_value, new_value)
+        self._tail = round(new_value) >= self.max_scroll_y
+        self.post_viewport()
+
+    def on_resize(self):
+        self.post_viewport()
+
+    def post_viewport(self):
+        # nothing is visible while plotting
+        if self._formatter is not None and self.scrollable_content_region.height:
+            first = round(self.scroll_offset.y)
+            height = max(self.scrollable_content_region.height, 1)
+            last = min(first + height, self._nlines) - 1
+            self.post_message(self.ViewportChanged(first, last, self._nlines))
+
+    def get_line(self, line):
+        """Elements of a line, or None until the lines around it have been read"""
+        start = self._block_start
+        if self._block is not None and start <= line < start + len(self._block):
+            return self._block[line - start]
+        height = self.block_lines() // 3
+        start = max(round(self.scroll_offset.y) - height, 0)
+        stop = min(start + 3 * height, self._nlines)
+        if isinstance(self._data, np.ndarray):
+            self._block_start, self._block = start, read_lines(self._data, start, stop)
+            return self._block[line - start]
+        if self._pending != (start, stop):
+            self._pending = (start, stop)
+            self.fetch_lines(self._data, start, stop)
+        return None
+
+    @work(thread=True, exclusive=True, group="lines")
+    def fetch_lines(self, data, start, stop):
+        worker = get_current_worker()
+        block = read_lines(data, start, stop, self._pager)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.set_block, data, start, block)
+
+    def set_block(self, data, start, block):
+        if data is self._data:
+            self._block_start, self._block = start, block
+            self._pending = None
+            self.refresh()
+
+    def format_cells(self, values, offset, width):
+        """Text of the cells of a line which are visible from `offset` on"""
+        cell_width = self._cell_width + 1
+        if self._summarize:
+            edge = self._edgeitems
+            cells = [self._formatter(value) for value in values[:edge]]
+            cells.append("...")
+            cells.extend(self._formatter(value) for value in values[-edge:])
+            first = 0
+        else:
+            first = offset // cell_width
+            last = first + width // cell_width + 2
+            cells = [self._formatter(value) for value in values[first:last]]
+
+        widest = max(map(len, cells), default=0)
+        if widest > self._cell_width:
+            # the sample missed wider elements, the columns are widened
+            self._cell_width = widest
+            self.call_after_refresh(self.resize_lines)
+        text = "".join(self._justify(cell, self._cell_width) + " " for cell in cells)
+        start = offset - first * cell_width
+        return text[start : start + width]
+
+    def render_line(self, y):
+        width = self.scrollable_content_region.width
+        scroll_x, scroll_y = round(self.scroll_offset.x), round(self.scroll_offset.y)
+        style = self.rich_style
+        line = scroll_y + y
+        if self._formatter is None or line >= self._nlines:
+            return Strip.blank(width, style)
+
+        label = ""
+        if self._label_width:
+            label = f"{line_label(self._data.shape, line):>{self._label_width}}: "
+        values = self.get_line(line)
+        if values is None:
+            text = "…" if UNICODE_SUPPORT else "..."
+        elif self._ncols == 0:
+            text = self._justify(self._formatter(values), self._cell_width)
+        else:
+            # the labels stay in place when scrolling horizontally
+            text = self.format_cells(values, scroll_x, max(width - len(label), 0))
+        return Strip([Segment(label + text, style)]).crop_extend(0, width, style)
+
+    def action_scroll_left(self):
+        self.scroll_relative(x=-(self._cell_width + 1), animate=False)
+
+    def action_scroll_right(self):
+        self.scroll_relative(x=self._cell_width + 1, animate=False)
+
+
+def format_cell(value):
+    return str(value).replace("\n", " ")
+
+
+def fit_cell(text, width):
+    """Pad or truncate the text of a table cell to the column width"""
+    if len(text) > width:
+        return text[: width - 1] + "…"
+    return text.ljust(width)
 
 
 def is_dataframe(obj):
@@ -134,18 +1007,19 @@ def is_dataframe(obj):
     return len(obj.dtype) != 0
 
 
-def is_plotable(obj):
-    is_not_composity_type = len(obj.dtype) == 0
-    squeezed = np.squeeze(obj)
-    return is_not_composity_type and (squeezed.ndim == 1 or squeezed.ndim == 2)
+def squeezed_ndim(obj):
+    """Number of dimensions of an array or dataset after squeezing"""
+    return sum(dim != 1 for dim in obj.shape)
 
 
-def is_aggregatable(obj):
-    return (
-        isinstance(obj, np.ndarray)
-        and np.issubdtype(obj.dtype, np.number)
-        and obj.size > 1
+def is_plotable(obj):
+    is_not_composity_type = len(obj.dtype) == 0
+    # strings and other objects cannot be reduced to points
+    is_numeric = np.issubdtype(obj.dtype, np.number) and not np.issubdtype(
+        obj.dtype, np.complexfloating
     )
+    ndim = squeezed_ndim(obj)
+    return is_not_composity_type and is_numeric and (ndim == 1 or ndim == 2)
 
 
 def add_escape_chars(string: str):
@@ -156,6 +1030,76 @@ def remove_escaped_chars(string: str):
     return string.replace(r"\[", "[")
 
 
+def format_nbytes(nbytes):
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if nbytes < 1024:
+            break
+        nbytes /= 1024
+    return f"{nbytes:.1f} {unit}" if unit != "B" else f"{nbytes} B"
+
+
+def format_target(target):
+    """Target of a link, e.g. `/path` or `file.h5:/path`"""
+    fname, path = target
+    return path if fname is None else f"{fname}:{path}"
+
+
+def describe_link(h5file, path, item, files):
+    """Summary of a link and of the object it points to, if it can be reached"""
+    if item.kind == USER_LINK:
+        return f"{item.name}\n\nUser defined link, which is not followed"
+    kind = "Soft" if item.kind == SOFT_LINK else "External"
+    lines = [item.name, "", f"{kind} link to {format_target(item.target)}"]
+    try:
+        target = resolve_link(h5file, path, files)
+    except LinkError as err:
+        lines.append(f"Cannot be followed: {err}")
+        return "\n".join(lines)
+    if target.ancestor:
+        lines.append("Points to a group containing the link, which forms a cycle")
+    target_item = item_info(
+        target.file.id, target.path.encode("utf8"), follow_links=True
+    )
+    lines.extend(["", describe_item(target.file, target.path, target_item, files)])
+    return "\n".join(lines)
+
+
+def describe_item(h5file, path, item, files):
+    """Summary of an item from its metadata and a few of its elements"""
+    if item.kind in LINK_KINDS:
+        return describe_link(h5file, path, item, files)
+    lines = [item.name, ""]
+    if item.kind == GROUP:
+        lines.append(f"Group with {len(h5file[path])} members")
+    elif item.kind == DATATYPE:
+        lines.append(f"Datatype {h5file[path].dtype}")
+    else:
+        dset = h5file[path]
+        nbytes = dset.size * dset.dtype.itemsize
+        stored = dset.id.get_storage_size()
+        lines.append(f"Shape: {item.shape}")
+        lines.append(f"Dtype: {item.dtype}")
+        lines.append(f"Chunks: {item.chunks}")
+        lines.append(f"Filters: {', '.join(item.filters) or 'none'}")
+        lines.append(f"Size: {format_nbytes(nbytes)}")
+        if stored:
+            lines.append(
+                f"Stored: {format_nbytes(stored)} (ratio {nbytes / stored:.2f})"
+            )
+        if item.virtual:
+            # reading a sample would open the source files
+            lines.extend(["", *describe_sources(dset)])
+        elif dset.size > 0:
+            # the first elements along the last axis
+            selection = tuple([0] * max(dset.ndim - 1, 0))
+            if dset.ndim > 0:
+                selection += (slice(0, PREVIEW_SAMPLE_ELEMENTS),)
+            sample = read_hyperslab(dset, selection)
+            lines.extend(["", "Sample:", str(sample)])
+    lines.extend(["", f"Attributes: {item.num_attrs}"])
+    return "\n".join(lines)
+
+
 class MyOptionList(OptionList):
     BINDINGS = [
         Binding("down,j", "cursor_down", "Down", show=True),
@@ -181,6 +1125,297 @@ class MyOptionList(OptionList):
             return True
 
 
+class VirtualOptionList(ScrollView, can_focus=True):
+    """
+    Option list which only formats the prompts of the visible rows
+
+    The prompts are given as a sequence which is only indexed for the rows on
+    screen, such that groups with millions of members can be listed without
+    materializing them. Navigating the list is independent of its length.
+    """
+
+    BINDINGS = [
+        Binding("down,j", "cursor_down", "Down", show=True),
+        Binding("up,k", "cursor_up", "Up", show=True),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("G", "last", "Bottom", show=False),
+        Binding("g", "first", "Top", show=False),
+    ]
+
+    COMPONENT_CLASSES = {
+        "option-list--option",
+        "option-list--option-highlighted",
+    }
+
+    DEFAULT_CSS = """
+    VirtualOptionList {
+        height: auto;
+        max-height: 100%;
+        color: $foreground;
+        overflow-x: hidden;
+        border: tall $border-blurred;
+        padding: 0 1;
+        background: $surface;
+        & > .option-list--option-highlighted {
+            color: $foreground;
+            background: $block-cursor-blurred-background;
+        }
+        &:focus {
+            border: tall $border;
+            background-tint: $foreground 5%;
+            & > .option-list--option-highlighted {
+                color: $block-cursor-foreground;
+                background: $block-cursor-background;
+                text-style: $block-cursor-text-style;
+            }
+        }
+    }
+    """
+
+    # the highlighted row is scrolled into view even if it did not change
+    highlighted = reactive(None, always_update=True)
+
+    class Highlighted(Message):
+        """Posted whenever the highlighted row is set"""
+
+        def __init__(self, option_list):
+            super().__init__()
+            self.option_list = option_list
+
+    def __init__(self, prompts=(), id=None):
+        super().__init__(id=id)
+        self._prompts = prompts
+
+    @property
+    def option_count(self):
+        return len(self._prompts)
+
+    def get_prompt(self, index):
+        return self._prompts[index]
+
+    def set_prompts(self, prompts, highlighted=0):
+        """Replace the listed prompts without formatting any of them"""
+        self._prompts = prompts
+        self.virtual_size = Size(self.scrollable_content_region.width, len(prompts))
+        self.scroll_to(y=0, animate=False)
+        self.highlighted = highlighted
+        self.refresh()
+
+    def on_mount(self):
+        self.virtual_size = Size(0, len(self._prompts))
+        if self._prompts:
+            self.highlighted = 0
+
+    def validate_highlighted(self, highlighted):
+        if highlighted is None or not self._prompts:
+            return None
+        return min(max(highlighted, 0), len(self._prompts) - 1)
+
+    def watch_highlighted(self, highlighted):
+        if highlighted is not None:
+            top = round(self.scroll_offset.y)
+            height = max(self.scrollable_content_region.height, 1)
+            if highlighted < top:
+                self.scroll_to(y=highlighted, animate=False)
+            elif highlighted >= top + height:
+                self.scroll_to(y=highlighted - height + 1, animate=False)
+        self.refresh()
+        self.refresh_bindings()
+        self.post_message(self.Highlighted(self))
+
+    def render_line(self, y):
+        index = round(self.scroll_offset.y) + y
+        width = self.scrollable_content_region.width
+        if index >= len(self._prompts):
+            return Strip.blank(
+                width, self.get_component_rich_style("option-list--option")
+            )
+        if index == self.highlighted:
+            style = self.get_component_rich_style("option-list--option-highlighted")
+        else:
+            style = self.get_component_rich_style("option-list--option")
+        return Strip([Segment(self._prompts[index], style)]).crop_extend(
+            0, width, style
+        )
+
+    def on_click(self, event):
+        offset = event.get_content_offset(self)
+        if offset is not None:
+            index = round(self.scroll_offset.y) + offset.y
+            if index < len(self._prompts):
+                self.highlighted = index
+
+    def action_cursor_down(self):
+        if self._prompts:
+            if self.highlighted is None:
+                self.highlighted = 0
+            else:
+                self.highlighted = (self.highlighted + 1) % len(self._prompts)
+
+    def action_cursor_up(self):
+        if self._prompts:
+            if self.highlighted is None:
+                self.highlighted = len(self._prompts) - 1
+            else:
+                self.highlighted = (self.highlighted - 1) % len(self._prompts)
+
+    def action_page_down(self):
+        if self._prompts:
+            self.highlighted = (
+                self.highlighted or 0
+            ) + self.scrollable_content_region.height
+
+    def action_page_up(self):
+        if self._prompts:
+            self.highlighted = (
+                self.highlighted or 0
+            ) - self.scrollable_content_region.height
+
+    def action_first(self):
+        self.highlighted = 0
+
+    def action_last(self):
+        self.highlighted = len(self._prompts) - 1
+
+    def check_action(self, action, parameters):
+        if action in ["cursor_down", "cursor_up"] and self.app.has_class(
+            "view-dataset"
+        ):
+            return False
+        else:
+            return True
+
+
+class LazyPrompts:
+    """Sequence of prompts which are only formatted when accessed"""
+
+    def __init__(self, items, format_prompt):
+        self._items = items
+        self._format_prompt = format_prompt
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._format_prompt(self._items[index])
+
+
+class DistributionPanel(Static):
+    """
+    Quantiles and histogram of the values of an array, or of a field of a table
+
+    An estimate from a random sample of blocks is shown at once, then
+    replaced by the distribution of all values, which is sketched block by
+    block on a thread worker.
+    """
+
+    def __init__(self, id=None):
+        super().__init__(id=id, markup=False)
+        self._data = None
+        self._field = None
+        # distributions of all values by field (None for arrays)
+        self._complete = {}
+        self._shown = None
+
+    def clear(self):
+        """Stop computing and forget the distributions of the current data"""
+        self.workers.cancel_node(self)
+        self._data = self._field = self._shown = None
+        self._complete.clear()
+        self.border_title = self.border_subtitle = ""
+        self.update("")
+
+    def show(self, data, field=None):
+        """Show the distribution of an array, or of a field of a table"""
+        if data is not self._data:
+            self.clear()
+            self._data = data
+        self._field = field
+        self.border_title = (
+            "Distribution" if field is None else f"Distribution of {field}"
+        )
+        self.workers.cancel_node(self)
+        dist = self._complete.get(field)
+        if dist is not None:
+            self.show_distribution(data, field, dist, True)
+        else:
+            self._shown = None
+            self.border_subtitle = "sampling..."
+            self.update("")
+            self.load_distribution(data, field)
+
+    def show_message(self, text):
+        self.workers.cancel_node(self)
+        self._field = self._shown = None
+        self.border_title = "Distribution"
+        self.border_subtitle = ""
+        self.update(text)
+
+    @work(thread=True, exclusive=True, group="distribution")
+    def load_distribution(self, data, field):
+        """Estimate the distribution from a sample, then sketch all values"""
+        worker = get_current_worker()
+        with span("sample distribution", "aggregate"):
+            estimate, complete = estimate_distribution(data, field)
+        if worker.is_cancelled:
+            return
+        self.app.call_from_thread(
+            self.show_distribution, data, field, estimate, complete
+        )
+        if complete:
+            return
+
+        def progress(done, total):
+            self.app.call_from_thread(self.show_progress, data, field, done, total)
+
+        with span("distribution", "aggregate"):
+            dist = aggregate_distribution(
+                data,
+                estimate.edges,
+                field,
+                progress=progress,
+                cancelled=lambda: worker.is_cancelled,
+            )
+        if dist is not None and not worker.is_cancelled:
+            self.app.call_from_thread(self.show_distribution, data, field, dist, True)
+
+    def show_progress(self, data, field, done, total):
+        if data is self._data and field == self._field:
+            self.border_subtitle = f"estimate, reading all values {done}/{total}"
+
+    def show_distribution(self, data, field, dist, complete):
+        if data is not self._data or field != self._field:
+            # computed for data or a field which is no longer shown
+            return
+        if complete:
+            self._complete[field] = dist
+            self.border_subtitle = f"{dist.count} values"
+        else:
+            self.border_subtitle = f"estimate from {dist.count} of {data.size} values"
+        self._shown = dist
+        self.render_distribution()
+
+    def render_distribution(self):
+        if self._shown is not None:
+            bar = "█" if UNICODE_SUPPORT else "#"
+            width = self.content_region.width
+            self.update("\n".join(format_distribution(self._shown, width, bar)))
+
+    def on_resize(self):
+        self.render_distribution()
+
+    def extend(self, data, rows):
+        """Fold the rows appended to a followed dataset into the distributions"""
+        if self._data is None:
+            return
+        for field, dist in self._complete.items():
+            dist.merge(Distribution.from_array(field_values(rows, field), dist.edges))
+        self._data = data
+        # a distribution still being computed is started over
+        self.show(data, self._field)
+
+
 class ColumnContent(VerticalScroll):
     """Column which displays a dataset"""
 
@@ -191,56 +1426,276 @@ class ColumnContent(VerticalScroll):
         Binding("pagedown,d", "page_down", "Page down", show=False),
         Binding("G", "scroll_end", "Bottom", show=False),
         Binding("g", "scroll_home", "Top", show=False),
+        Binding("L", "scroll_right", "Scroll right", show=False),
+        Binding("H", "scroll_left", "Scroll left", show=False),
     ]
 
     def compose(self):
-        self._content = Static(id="data", markup=False)
+        self._value = None
+        self._pager = None
+        self._table_pager = None
+        # reductions of the plotted data, which are extended when it grows
+        self._series = None
+        self._matrix = None
+        self._content = ArrayLines(id="data")
         self._plot = PlotextPlot(id="plot")
         self._df = MyDataTable(id="dtable")
+        self._distribution = DistributionPanel(id="distribution")
+        # docked first, such that it is next to the data, plot or table
+        yield self._distribution
         yield self._content
         yield self._plot
         yield self._df
 
-    def update_value(self, value):
+    def update_value(self, value, pager=None):
+        """Set the displayed data, with a pager over it if it was prefetched"""
         # save value to be able to reference it in toggle truncate
         self._value = value
+        self.border_subtitle = ""
+        self._pager = self._table_pager = None
+        self._series = self._matrix = None
+        if is_dataframe(value):
+            self._table_pager = pager
+        elif pager is not None:
+            self._pager = pager
+        elif (
+            isinstance(value, h5py.Dataset) and needs_paging(value) and value.ndim <= 2
+        ):
+            # large datasets are only read around the displayed rows
+            self._pager = DatasetPager(value, page_len=self.page_rows())
+
+    def page_rows(self):
+        """Number of rows of a paged dataset displayed at once"""
+        return max(self.app.size.height, 1)
+
+    def show_loading(self):
+        """Show a placeholder until a dataset has been loaded"""
+        self.cancel()
+        self._value = None
+        self._pager = self._table_pager = None
+        self.border_subtitle = ""
+        self.set_placeholder(True)
+        self.focus()
+
+    def set_placeholder(self, loading):
+        # the container itself keeps the focus, so only its children are covered
+        self._content.loading = loading
+        self._df.loading = loading
+
+    def cancel(self):
+        """Cancel the pending rendering of a previous dataset"""
+        self.workers.cancel_node(self)
+        self._content.clear()
+        self._distribution.clear()
+        self.set_placeholder(False)
 
     def reprint(self):
-        """Used to reprint if the numpy formatting is modified"""
+        """Display the data, reading only what is on screen"""
+        if self._value is None:
+            return
+
         if is_dataframe(self._value):
+            self.set_placeholder(False)
             self.notify("Entering data table: use capital H and L to navigate columns")
-            self._df.update(self._value)
+            self._df.update(self._value, self._table_pager)
             self._df.focus()
 
         else:
-            self._content.update(f"{self._value}")
+            self._content.update(self._value, self._pager)
+        if self.app.has_class("view-distribution"):
+            self.show_distribution()
+
+    def show_distribution(self):
+        """Show the distribution of the data, or of the column of the cursor"""
+        if self._value is None:
+            # shown once the data is loaded
+            return
+        if not is_dataframe(self._value):
+            self._distribution.show(self._value)
+            return
+        name = self._df.highlighted_name()
+        if name in distribution_fields(self._value.dtype):
+            self._distribution.show(self._value, name)
+        else:
+            self._distribution.show_message(f"{name} is not a numeric field")
+
+    def on_my_data_table_column_highlighted(self, event):
+        if self.app.has_class("view-distribution"):
+            self.show_distribution()
+
+    def extend(self, value, nrows, rows, pager=None):
+        """Show the rows appended after the first `nrows` when following a file"""
+        self._value = value
+        if self.app.has_class("view-distribution"):
+            self._distribution.extend(value, rows)
+        if is_dataframe(value):
+            self._df.extend(nrows)
+            return
+        if pager is not None:
+            self._pager = pager
+        elif self._pager is not None:
+            self._pager.invalidate(nrows)
+        self._content.extend(value, self._pager)
+        if self.app.has_class("view-plot"):
+            self.extend_plot(rows, nrows)
+
+    def extend_plot(self, rows, nrows):
+        """Reduce only the rows appended after the first `nrows` and redraw"""
+        data = SqueezedData(self._value)
+        if nrows <= 1 or not is_plotable(data):
+            # the first axis was squeezed, the plot changes shape
+            self.replot()
+            return
+        if self._series is not None:
+            reduced = self._series.size
+        elif self._matrix is not None:
+            reduced = self._matrix.nrows
+        else:
+            return
+        if reduced < nrows:
+            # rows appended while the plot was being reduced are read first
+            self.read_plot_rows(self._value, reduced, nrows + len(rows))
+            return
+        rows = rows[reduced - nrows :]
+        if not len(rows):
+            return
+        if self._series is not None:
+            self._series.append(rows)
+            self.draw_series(*self._series.series())
+        else:
+            self._matrix.append(rows)
+            self.draw_matrix(self._matrix.matrix(), data.shape)
+
+    @work(thread=True, group="plot")
+    def read_plot_rows(self, value, start, stop):
+        """Read the rows from `start` to `stop` which the plot is missing"""
+        worker = get_current_worker()
+        rows = read_hyperslab(value, np.s_[start:stop])
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.extend_plot, rows, start)
+
+    def reformat(self):
+        """Used to reformat the data if the numpy formatting is modified"""
+        if self._value is not None and not is_dataframe(self._value):
+            self._content.set_options(np.get_printoptions())
+
+    def on_array_lines_viewport_changed(self, event):
+        if event.first > 0 or event.last < event.total - 1:
+            self.border_subtitle = f"rows {event.first}-{event.last} of {event.total}"
+        else:
+            self.border_subtitle = ""
+
+    def action_scroll_down(self):
+        self._content.scroll_down(animate=False)
+
+    def action_scroll_up(self):
+        self._content.scroll_up(animate=False)
+
+    def action_page_down(self):
+        self._content.scroll_page_down(animate=False)
+
+    def action_page_up(self):
+        self._content.scroll_page_up(animate=False)
+
+    def action_scroll_end(self):
+        self._content.scroll_end(animate=False)
+
+    def action_scroll_home(self):
+        self._content.scroll_home(animate=False)
+
+    def action_scroll_right(self):
+        self._content.action_scroll_right()
+
+    def action_scroll_left(self):
+        self._content.action_scroll_left()
 
     def replot(self):
         """Plot data, currently only supports 1D and 2D data"""
-        data = np.squeeze(self._value)
-        if is_plotable(data):
-            self._plot.plt.clear_figure()
-            if data.ndim == 1:
-                self._plot.plt.xlabel("Index")
-                self._plot.plt.plot(
-                    np.arange(data.shape[0]),
-                    data,
-                    color="cyan",
-                    marker="braille",
-                )
-            elif data.ndim == 2:
-                nrows, ncols = data.shape
-                self._plot.plt.plot_size(nrows, ncols)
-                # arbitrary, should be expermineted with
-                size_threshold = 100
-                if nrows < size_threshold and ncols < size_threshold:
-                    self._plot.plt.heatmap(pd.DataFrame(data))
-                    # heatmap has default title, remove it
-                    self._plot.plt.title("")
-                else:
-                    self._plot.plt.matrix_plot(data.tolist())
-                self._plot.plt.xlabel("Column")
-                self._plot.plt.ylabel("Row")
+        if self._value is not None:
+            self._series = self._matrix = None
+            self.load_plot_data()
+
+    @work(thread=True, exclusive=True, group="plot")
+    @traced("decimate", "plot")
+    def load_plot_data(self):
+        """
+        Reduce the data to the resolution of the terminal on a thread worker
+
+        Large datasets are first drawn from a strided preview read, which is
+        then replaced by the exact reduction streamed over the whole dataset.
+        """
+        worker = get_current_worker()
+        data = SqueezedData(self._value)
+        if not is_plotable(data):
+            return
+        width, height = self.app.size
+
+        if data.ndim == 1:
+            # braille markers have two dots per character
+            num_buckets = 2 * width
+            stride = max(data.size // PREVIEW_POINTS, 1)
+            if stride > 1:
+                preview = read_hyperslab(data, np.s_[::stride])
+                x, y = decimate_1d(preview, num_buckets).series()
+                title = f"Preview of every {stride}th element"
+                self.app.call_from_thread(self.draw_series, x * stride, y, title)
+            series = decimate_1d(data, num_buckets, lambda: worker.is_cancelled)
+            if series is not None and not worker.is_cancelled:
+                self.app.call_from_thread(self.show_series, series)
+
+        else:
+            target = (height, width)
+            factors = reduction_factors(data.shape, target)
+            if factors != (1, 1):
+                preview = read_hyperslab(data, np.s_[:: factors[0], :: factors[1]])
+                title = "Preview of every {}x{}th element".format(*factors)
+                self.app.call_from_thread(self.draw_matrix, preview, data.shape, title)
+            matrix = decimate_2d(data, target, lambda: worker.is_cancelled)
+            if matrix is not None and not worker.is_cancelled:
+                self.app.call_from_thread(self.show_matrix, matrix, data.shape)
+
+    def show_series(self, series):
+        self._series = series
+        self.draw_series(*series.series())
+
+    def show_matrix(self, matrix, shape):
+        self._matrix = matrix
+        self.draw_matrix(matrix.matrix(), shape)
+
+    @traced("draw series", "plot")
+    def draw_series(self, x, y, title=""):
+        self._plot.plt.clear_figure()
+        self._plot.plt.title(title)
+        self._plot.plt.xlabel("Index")
+        self._plot.plt.plot(x, y, color="cyan", marker="braille")
+        self._plot.refresh()
+
+    @traced("draw matrix", "plot")
+    def draw_matrix(self, matrix, shape, title=""):
+        """Draw a (possibly reduced) matrix labelled with the indices of `shape`"""
+        self._plot.plt.clear_figure()
+        nrows, ncols = shape
+        # arbitrary, should be expermineted with
+        size_threshold = 100
+        if nrows < size_threshold and ncols < size_threshold:
+            self._plot.plt.plot_size(nrows, ncols)
+            self._plot.plt.heatmap(pd.DataFrame(matrix))
+        else:
+            self._plot.plt.matrix_plot(matrix.tolist())
+            # label the ticks of the reduced matrix with the original indices
+            # (the first row is drawn at the top, i.e. at the largest y)
+            rows, cols = matrix.shape
+            xticks = np.linspace(0, cols - 1, 5).astype(int)
+            yticks = np.linspace(0, rows - 1, 5).astype(int)
+            self._plot.plt.xticks(xticks, (xticks * ncols // cols).tolist())
+            self._plot.plt.yticks(
+                yticks, ((rows - 1 - yticks) * nrows // rows).tolist()
+            )
+        # heatmap has default title, replace it
+        self._plot.plt.title(title)
+        self._plot.plt.xlabel("Column")
+        self._plot.plt.ylabel("Row")
+        self._plot.refresh()
 
 
 class Column(Container):
@@ -249,7 +1704,7 @@ class Column(Container):
     def __init__(self, dirs, focus=False):
         super().__init__()
         self._focus = focus
-        self._selector_widget = MyOptionList(*dirs, id="dirs", markup=False)
+        self._selector_widget = VirtualOptionList(dirs, id="dirs")
         self._content_widget = ColumnContent(id="content")
 
     def compose(self):
@@ -260,9 +1715,7 @@ class Column(Container):
 
     def update_list(self, dirs, prev_highlighted):
         """Redraw option list with contents of current directory"""
-        self._selector_widget.clear_options()
-        self._selector_widget.add_options(dirs)
-        self._selector_widget.highlighted = prev_highlighted
+        self._selector_widget.set_prompts(dirs, prev_highlighted)
 
 
 class H5TUIApp(App):
@@ -278,18 +1731,50 @@ class H5TUIApp(App):
         Binding("s", "suppress_print", "Suppress", show=True),
         Binding("p", "toggle_plot", "Plot", show=True),
         Binding("A", "aggregate_data", "Aggregate", show=True),
+        Binding("D", "toggle_distribution", "Distribution", show=True),
+        Binding("slash", "search", "Search", show=True),
+        Binding("colon", "select_data", "Select", show=True),
+        Binding("e", "export_data", "Export", show=True),
     ]
     CSS_PATH = "h5tui.tcss"
     TITLE = "h5tui"
 
-    def __init__(self, fname):
+    def __init__(
+        self, fname, use_index=False, file_options=None, follow=None, compare=None
+    ):
         super().__init__()
 
+        # set by --profile, see h5tui.profiling
+        self._profiler = get_profiler()
+
         self._fname = fname
-        self._file = h5py.File(fname)
+        # the chunk cache is sized per dataset unless it is configured
+        file_options = file_options or {}
+        self._auto_chunk_cache = "rdcc_nbytes" not in file_options
+        # interval in seconds at which the displayed dataset is checked for
+        # appended rows, which requires reading the file in SWMR mode
+        self._follow = follow
+        if follow:
+            file_options = {**file_options, "swmr": True}
+        self._file = open_file(fname, **file_options)
+        # metadata of the members of recently visited groups
+        self._listings = ListingCache(self._file)
+        # files of the external links followed so far
+        self._external_files = ExternalFiles()
+        self._index = None
+        self._use_index = use_index
+        if use_index:
+            self._index = StructureIndex.load(fname)
+            if self._index is not None:
+                self._listings.set_index(self._index)
+            else:
+                self._use_index = "build"
+        # built in the background when first searching
+        self.search_index = None
 
         self._cur_dir = str(self._file.name)
-        self._dirs = self.get_dir_content(self._cur_dir)
+        # datasets read ahead while moving the cursor
+        self._prefetched = PrefetchCache()
 
         self._prev_highlighted = 0
 
@@ -298,6 +1783,25 @@ class H5TUIApp(App):
         np.set_printoptions(linewidth=self.size.width)
 
         self.is_aggregated = False
+        # statistics of the dataset, which are updated when it grows
+        self._stats = None
+        # handle of the followed dataset and the worker checking it
+        self._follow_handle = None
+        self._follow_worker = None
+        # shape of the displayed data, a followed dataset may already report
+        # rows which are not shown yet
+        self._shown_shape = None
+
+        # file and groups compared with, given by --compare, and the records
+        # of the compared objects by their path in this file
+        self._compare = compare
+        if compare is not None:
+            # started while stderr is a file, which it no longer is once the
+            # app runs, for the worker processes of the comparison
+            resource_tracker.ensure_running()
+        self._diffs = {}
+        # groups containing objects which differ
+        self._diff_groups = set()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -305,98 +1809,505 @@ class H5TUIApp(App):
 
         self._header_widget = Static("Path: /", id="header", markup=False)
         yield self._header_widget
+        self._progress_widget = ProgressBar(id="progress", show_eta=False)
+        yield self._progress_widget
+        if self._profiler is not None:
+            self._profile_widget = Static(id="profile", markup=False)
+            yield self._profile_widget
         with Horizontal():
             dir_with_metadata = self.add_dir_metadata()
             self._column1 = Column(dir_with_metadata, focus=True)
             yield self._column1
-
-    def group_or_dataset(self, elem):
-        h5elem = self._file[self._cur_dir + f"/{elem}"]
+            self._preview_widget = Static(id="preview", markup=False)
+            yield self._preview_widget
+
+    def on_mount(self):
+        if self._profiler is not None:
+            self._last_tick = time.perf_counter()
+            self.set_interval(PROFILE_TICK, self.check_event_loop)
+        if self._use_index == "build":
+            self.notify("Building structure index...", timeout=2)
+            self.build_index()
+        if self._follow:
+            self.set_interval(self._follow, self.check_growth)
+        if self._compare is not None:
+            self.notify(f"Comparing with {self._compare[0]}...", timeout=2)
+            self.run_compare()
+
+    def check_event_loop(self):
+        """
+        Record the time by which a tick was late as the event loop being
+        blocked (e.g. by layout, rendering or work done on the loop)
+        """
+        now = time.perf_counter()
+        lag = now - self._last_tick - PROFILE_TICK
+        if lag > PROFILE_TICK:
+            self._profiler.record("event loop blocked", "ui", now - lag, lag)
+        self._last_tick = now
+        self._profile_widget.update(format_totals(self._profiler.totals()))
+
+    @work(thread=True, exclusive=True, group="index")
+    def build_index(self):
+        """Traverse the file once on a thread worker and save its structure"""
+        key = file_key(self._fname)
+        with span("build structure index", "metadata"):
+            index = StructureIndex.build(self._file)
+        path = index.save(self._fname, key)
+        self.call_from_thread(self.set_structure_index, index)
+        if path is None:
+            self.call_from_thread(
+                self.notify, "Could not save structure index", severity="warning"
+            )
+        else:
+            self.call_from_thread(self.notify, f"Structure index saved to {path}")
+
+    @work(thread=True, exclusive=True, group="compare")
+    def run_compare(self):
+        """Compare the file with another one on a pool of worker processes"""
+        worker = get_current_worker()
+        fname, root_a, root_b = self._compare
+        records = compare_files(
+            self._fname,
+            fname,
+            root_a,
+            root_b,
+            cancelled=lambda: worker.is_cancelled,
+        )
+        try:
+            with span("compare", "io"):
+                for record in records:
+                    self.call_from_thread(self.add_diff, record)
+        except (OSError, ValueError) as err:
+            self.call_from_thread(
+                self.notify, f"Comparison failed: {err}", severity="error"
+            )
+            return
+        finally:
+            records.close()
+        if not worker.is_cancelled:
+            self.call_from_thread(self.finish_compare)
+
+    def add_diff(self, record):
+        """Mark an object compared with the other file in the tree"""
+        root = self._compare[1]
+        path = join_path(root, record["path"])
+        self._diffs[path] = record
+        # objects missing from this file are marked on their parent group
+        if record["status"] != "equal":
+            group = path
+            while group != "/":
+                group = posixpath.dirname(group)
+                self._diff_groups.add(group)
+        self._column1._selector_widget.refresh()
+
+    def finish_compare(self):
+        records = self._diffs.values()
+        differ = sum(record["status"] != "equal" for record in records)
+        self.notify(
+            f"Comparison done: {differ} of {len(records)} objects differ",
+            severity="warning" if differ else "information",
+        )
+        failed = [
+            path for path, record in self._diffs.items() if record["status"] == "error"
+        ]
+        if failed:
+            shown = ", ".join(failed[:COMPARE_ERRORS_SHOWN])
+            more = len(failed) - COMPARE_ERRORS_SHOWN
+            self.notify(
+                f"Could not compare {shown}"
+                + (f" and {more} more" if more > 0 else ""),
+                severity="error",
+            )
+
+    def set_structure_index(self, index):
+        self._index = index
+        self._listings.set_index(index)
+
+    @work(thread=True, exclusive=True, group="search-index")
+    def build_search_index(self):
+        """Index the paths and attributes of all objects on a thread worker"""
+        worker = get_current_worker()
+        # reuse the listings of the structure index if there is one
+        groups = None if self._index is None else self._index.groups()
+        with span("build search index", "metadata"):
+            index = SearchIndex.build(
+                self._file, groups, cancelled=lambda: worker.is_cancelled
+            )
+        if index is not None:
+            self.call_from_thread(self.set_search_index, index)
+
+    def set_search_index(self, index):
+        self.search_index = index
+        if isinstance(self.screen, SearchScreen):
+            self.screen.refresh_results()
+
+    def group_or_dataset(self, item):
         if UNICODE_SUPPORT:
-            if isinstance(h5elem, h5py.Group):
-                return "📁  "
-            if isinstance(h5elem, h5py.Dataset):
-                return "📊  "
+            icons = {
+                GROUP: "📁  ",
+                DATASET: "📊  ",
+                DATATYPE: "🔣  ",
+                SOFT_LINK: "🔗  ",
+                EXTERNAL_LINK: "🌐  ",
+                USER_LINK: "❔  ",
+            }
         else:
-            if isinstance(h5elem, h5py.Group):
-                return "(Group)    "
-            if isinstance(h5elem, h5py.Dataset):
-                return "(DataSet)  "
+            icons = {
+                GROUP: "(Group)    ",
+                DATASET: "(DataSet)  ",
+                DATATYPE: "(Type)     ",
+                SOFT_LINK: "(Link)     ",
+                EXTERNAL_LINK: "(External) ",
+                USER_LINK: "(UserLink) ",
+            }
+        return icons[item.kind]
+
+    def selected_item(self):
+        """Return the metadata of the highlighted member of the current group"""
+        highlighted = self._column1._selector_widget.highlighted
+        listing = self._listings[self._cur_dir]
+        if highlighted is not None and highlighted < len(listing):
+            return listing[highlighted]
 
     def has_attr(self):
         """Return if the currently selected item has attributes"""
-        highlighted = self._column1._selector_widget.highlighted
-        if highlighted is not None:
-            prompt = self._column1._selector_widget.get_option_at_index(
-                highlighted
-            ).prompt
-            selected_item = self.get_itemname_from_prompt(prompt)
-            return self.build_attr_str(selected_item) != ""
+        item = self.selected_item()
+        if item is not None:
+            return item.num_attrs > 0
 
-    def build_attr_str(self, elem):
+    def build_attr_str(self, item):
         """Creates the has attributes string (▼ + num attrs)"""
-        h5elem = self._file[self._cur_dir + f"/{elem}"]
-        num_attrs = len(h5elem.attrs)
-        if num_attrs > 0:
-            return f"▼ ({num_attrs})"
+        if item.num_attrs > 0:
+            return f"▼ ({item.num_attrs})"
         else:
             return ""
 
+    def build_diff_str(self, item):
+        """Marks members which differ from the compared file, or are equal"""
+        if self._compare is None:
+            return ""
+        path = posixpath.join(self._cur_dir, item.name)
+        unequal = "≠" if UNICODE_SUPPORT else "!="
+        record = self._diffs.get(path)
+        if record is None:
+            return unequal if path in self._diff_groups else ""
+        if record["status"] == "equal":
+            return "="
+        if record["status"] == "differ":
+            return f"{unequal} {record['mismatches']} differ"
+        return f"{unequal} {format_diff(record)}"
+
+    def build_link_str(self, item):
+        """Target of a link, which is shown without following the link"""
+        if item.target is None:
+            return ""
+        arrow = "→" if UNICODE_SUPPORT else "->"
+        return f" {arrow} {format_target(item.target)}"
+
+    def build_prompt(self, item):
+        return (
+            self.group_or_dataset(item)
+            + item.name
+            + self.build_link_str(item)
+            + f"    {self.build_attr_str(item)}"
+            + f"    {self.build_diff_str(item)}"
+        )
+
     def add_dir_metadata(self):
-        items = list(self._file[self._cur_dir].keys())
-        with_type_icon = [self.group_or_dataset(item) + item for item in items]
-        with_attrs = [
-            with_type + f"    {self.build_attr_str(item)}"
-            for with_type, item in zip(with_type_icon, items)
-        ]
-        return with_attrs
+        """Prompts of the current group, formatted once they are displayed"""
+        return LazyPrompts(self._listings[self._cur_dir], self.build_prompt)
+
+    def open_dataset(self, path):
+        if self._auto_chunk_cache:
+            return open_dataset(self._file, path)
+        return self._file[path]
 
-    def get_itemname_from_prompt(self, prompt):
+    def prepare_dataset(self, path):
+        return self.prepare_data(self.open_dataset(path))
+
+    def prepare_data(self, dset):
         """
-        Returns the item name from the selected item
-        The selected item contains an icon for group or dset, itemname and the number of attributes
+        Read what is first displayed of a dataset (or a selection of it)
+
+        Returns small datasets read in full, or a pager over large datasets
+        and tables whose first page has been read. Large datasets of more
+        than two dimensions are read line by line as they are displayed.
         """
-        return prompt.split()[1]
+        height = self.size.height
+        if is_dataframe(dset):
+            pager = MyDataTable.create_pager(dset, height)
+        elif needs_paging(dset):
+            if dset.ndim > 2:
+                return dset
+            pager = DatasetPager(dset, page_len=max(height, 1))
+        else:
+            return read_hyperslab(dset)
+        pager.window(0, pager.page_len)
+        return pager
 
-    def get_dir_content(self, dir):
-        """Return contents of current path"""
-        return list(self._file[dir].keys())
+    def on_virtual_option_list_highlighted(self, event):
+        """Preview the highlighted item and read its neighbours ahead"""
+        if self.has_class("view-dataset"):
+            return
+        item = self.selected_item()
+        if item is None:
+            self._preview_widget.update("")
+            return
+        self.load_preview(os.path.join(self._cur_dir, item.name), item)
+
+        listing = self._listings[self._cur_dir]
+        index = event.option_list.highlighted
+        first = max(index - PREFETCH_NEIGHBOURS, 0)
+        last = min(index + PREFETCH_NEIGHBOURS, len(listing) - 1)
+        # the highlighted dataset first, then its neighbours by distance, the
+        # source files of virtual datasets are only opened when entering them
+        nearby = sorted(range(first, last + 1), key=lambda idx: abs(idx - index))
+        paths = [
+            os.path.join(self._cur_dir, listing[idx].name)
+            for idx in nearby
+            if listing[idx].kind == DATASET and not listing[idx].virtual
+        ]
+        if paths:
+            self.prefetch(paths)
+
+    @work(thread=True, exclusive=True, group="preview")
+    def load_preview(self, path, item):
+        worker = get_current_worker()
+        try:
+            text = describe_item(self._file, path, item, self._external_files)
+        except (OSError, TypeError, ValueError) as err:
+            text = f"{item.name}\n\nCould not be read: {err}"
+        if not worker.is_cancelled:
+            self.call_from_thread(self._preview_widget.update, text)
+
+    @work(thread=True, exclusive=True, group="prefetch")
+    def prefetch(self, paths):
+        """Read the first page of datasets ahead on a thread worker"""
+        worker = get_current_worker()
+        # nothing is read while the cursor keeps moving
+        time.sleep(PREFETCH_DELAY)
+        for path in paths:
+            if worker.is_cancelled:
+                return
+            if path in self._prefetched:
+                continue
+            try:
+                with span("prefetch", "io"):
+                    self._prefetched.put(path, self.prepare_dataset(path))
+            except (OSError, TypeError, ValueError):
+                # the dataset is read again (and the error shown) when opened
+                continue
 
     def update_content(self, path):
         dset = self._file[path]
-        dset_name = os.path.basename(path)
-        dset_shape = dset.shape
-        dset_data = dset[...]
 
-        self._data = dset_data
+        # the dataset is read on a worker, until then its handle is the data
+        self._data = dset
+        self._data_path = path
+        self._selection = ""
+        self._follow_handle = None
+        self._shown_shape = None
 
         self.add_class("view-dataset")
         if is_dataframe(self._data):
             self.add_class("view-dtable")
-            dset_dtype = [str(field[0]) for field in dset.dtype.fields.values()]
-        else:
-            dset_dtype = dset.dtype
 
-        self._column1._content_widget.update_value(self._data)
+        self._column1._content_widget.show_loading()
+        self.load_dataset(path)
+
+        self.update_header(self.dataset_header(dset))
+
+    def dataset_header(self, dset, view=None):
+        """Header describing a dataset and the selection from it, if any"""
+
+        def describe(data):
+            if is_dataframe(data):
+                dtype = [str(field[0]) for field in data.dtype.fields.values()]
+            else:
+                dtype = data.dtype
+            return f"<{dtype}> {data.shape}"
+
+        dset_name = os.path.basename(self._data_path)
+        header = f"Path: {self._cur_dir}\nDataset: {dset_name} {describe(dset)}"
+        if view is not None:
+            header += f"\nSelection: {self._selection} {describe(view)}"
+        record = self._diffs.get(self._data_path)
+        if record is not None:
+            header += f"\nCompared: {format_diff(record)}"
+        return header
+
+    def action_select_data(self):
+        if self.has_class("view-dataset"):
+            dset = self._file[self._data_path]
+            self.push_screen(
+                SelectionScreen(dset.shape, dset.dtype, self._selection),
+                self.apply_selection,
+            )
+
+    def apply_selection(self, text):
+        """Display the selection `text` of the dataset, reading only it"""
+        if text is None:
+            return
+        dset = self.open_dataset(self._data_path)
+        try:
+            indices, fields = parse_selection(text)
+            view = DatasetView(dset, indices, fields) if indices or fields else None
+        except SelectionError as err:
+            self.notify(str(err), severity="warning", timeout=3)
+            return
+
+        self._selection = text.strip() if view is not None else ""
+        self.cancel_aggregate()
+        self.is_aggregated = False
+        self._column1._content_widget.show_loading()
+        self.load_selection(dset if view is None else view)
+        self.update_header(self.dataset_header(dset, view))
+
+    @work(thread=True, exclusive=True, group="load")
+    def load_selection(self, data):
+        worker = get_current_worker()
+        entry = self.prepare_data(data)
+        if not worker.is_cancelled:
+            self.call_from_thread(self.show_dataset, entry)
+
+    @work(thread=True, exclusive=True, group="load")
+    def load_dataset(self, path):
+        """Read the dataset on a thread worker and display it once done"""
+        worker = get_current_worker()
+        # only the displayed rows of large datasets are read, see DatasetPager
+        entry = self._prefetched.take(path)
+        if entry is None:
+            entry = self.prepare_dataset(path)
+        if not worker.is_cancelled:
+            self.call_from_thread(self.show_dataset, entry)
+
+    def show_dataset(self, entry):
+        pager = entry if isinstance(entry, DatasetPager) else None
+        self._data = entry.dataset if pager is not None else entry
+        self._shown_shape = self._data.shape
+        # a selection may turn a table into an array and vice versa
+        self.set_class(is_dataframe(self._data), "view-dtable")
+        self._column1._content_widget.update_value(self._data, pager)
         self._column1._content_widget.reprint()
+        if self._follow:
+            # the handle which is read from has to be refreshed to see new rows
+            self._follow_handle = (
+                self._data
+                if isinstance(self._data, h5py.Dataset)
+                else self._file[self._data_path]
+            )
+        if self.has_class("view-plot"):
+            if is_plotable(self._data):
+                self._column1._content_widget.replot()
+            else:
+                self.remove_class("view-plot")
 
-        self.update_header(
-            f"Path: {self._cur_dir}\nDataset: {dset_name} <{dset_dtype}> {dset_shape}"
-        )
+    def check_growth(self):
+        """Look for rows appended to the displayed dataset, when following it"""
+        if (
+            self._follow_handle is None
+            or self._selection
+            or not self.has_class("view-dataset")
+            or (self._follow_worker is not None and self._follow_worker.is_running)
+        ):
+            return
+        self._follow_worker = self.read_appended(self._follow_handle, self._shown_shape)
+
+    @work(thread=True, exclusive=True, group="follow")
+    def read_appended(self, dset, shape):
+        """Refresh a dataset and read only the rows appended to the shown `shape`"""
+        worker = get_current_worker()
+        with span("refresh", "metadata"):
+            dset.refresh()
+        new_shape = dset.shape
+        if new_shape == shape:
+            return
+        rows = None
+        if new_shape[1:] == shape[1:] and new_shape[0] > shape[0]:
+            rows = read_hyperslab(dset, np.s_[shape[0] : new_shape[0]])
+        if not worker.is_cancelled:
+            self.call_from_thread(self.append_rows, dset, shape[0], rows)
+
+    def append_rows(self, dset, nrows, rows):
+        """Extend the displayed dataset by the rows read after its first `nrows`"""
+        if dset is not self._follow_handle or self._selection:
+            return
+        if rows is None:
+            # the dataset did not grow along its first axis only
+            self.update_content(self._data_path)
+            return
+
+        data, pager = self._data, None
+        if isinstance(data, np.ndarray):
+            if needs_paging(dset):
+                # too large to be kept in memory from now on
+                data = dset
+                if dset.ndim <= 2:
+                    pager = DatasetPager(dset, page_len=max(self.size.height, 1))
+            else:
+                data = np.concatenate([data, rows])
+        self._data = data
+        self._shown_shape = (nrows + len(rows),) + self._shown_shape[1:]
+        self._column1._content_widget.extend(data, nrows, rows, pager)
+
+        self.update_header(self.dataset_header(dset))
+        if self.is_aggregated and self._stats is not None:
+            self._stats.merge(RunningStats.from_array(rows))
+            self.show_aggregate(self._stats)
 
     def update_header(self, string):
+        self._header = string
         self._header_widget.update(string)
 
+    @work(thread=True, exclusive=True, group="aggregate")
     def aggregate_data(self):
-        stats = {
-            "mean": float(np.mean(self._data)),
-            "std": float(np.std(self._data)),
-            "max": float(np.max(self._data)),
-            "min": float(np.min(self._data)),
-            "L2 norm": float(np.linalg.norm(self._data)),
-        }
+        """Summarize the dataset in a single streaming pass on a thread worker"""
+        worker = get_current_worker()
+
+        def progress(done, total):
+            self.call_from_thread(
+                self._progress_widget.update, progress=done, total=total
+            )
+
+        with span("aggregate", "aggregate"):
+            result = aggregate_stats(
+                self._data, progress=progress, cancelled=lambda: worker.is_cancelled
+            )
+        if result is not None and not worker.is_cancelled:
+            self.call_from_thread(self.show_aggregate, *result)
+
+    @work(thread=True, group="aggregate")
+    def aggregate_rows(self, data, stats, start, stop):
+        """Merge the statistics of the rows from `start` to `stop` into `stats`"""
+        worker = get_current_worker()
+        with span("aggregate", "aggregate"):
+            rows = read_hyperslab(data, np.s_[start:stop])
+            stats.merge(RunningStats.from_array(rows))
+        if not worker.is_cancelled:
+            self.call_from_thread(self.show_aggregate, stats, stop)
+
+    def show_aggregate(self, stats, nrows=None):
+        """Show the statistics of the first `nrows` rows of the dataset"""
+        shown = self._shown_shape[0] if self._shown_shape else self._data.shape[0]
+        if nrows is not None and nrows < shown:
+            # rows appended while following during the aggregation
+            self.aggregate_rows(self._data, stats, nrows, shown)
+            return
+        self.remove_class("view-progress")
+        self._stats = stats
+        agg_string = (
+            "\nSummary: "
+            + "; ".join(
+                [f"{key} = {value:.5g}" for key, value in stats.summary().items()]
+            )
+            + "; "
+        )
+        self.update_header(self._header + agg_string)
+        self.is_aggregated = True
 
-        return stats
+    def cancel_aggregate(self):
+        self.workers.cancel_group(self, "aggregate")
+        self.remove_class("view-progress")
 
     def check_action(self, action, parameters):
         if (
@@ -406,6 +2317,9 @@ class H5TUIApp(App):
                 "suppress_print",
                 "toggle_plot",
                 "aggregate_data",
+                "toggle_distribution",
+                "select_data",
+                "export_data",
             ]
         ) and not self.has_class("view-dataset"):
             return False
@@ -420,16 +2334,10 @@ class H5TUIApp(App):
 
     def action_view_attrs(self) -> None:
         """Action to display the quit dialog."""
-        highlighted = self._column1._selector_widget.highlighted
-        if highlighted is not None:
-            prompt = self._column1._selector_widget.get_option_at_index(
-                highlighted
-            ).prompt
-            selected_item = self.get_itemname_from_prompt(prompt)
-            if self.build_attr_str(selected_item) != "":
-                self.push_screen(
-                    AttributeScreen(self._file, self._cur_dir, selected_item)
-                )
+        item = self.selected_item()
+        if item is not None:
+            if item.num_attrs > 0:
+                self.push_screen(AttributeScreen(self._file, self._cur_dir, item.name))
             else:
                 self.notify(
                     "Selected item does not have attributes",
@@ -447,19 +2355,118 @@ class H5TUIApp(App):
                 )
                 return
 
-            if not self.is_aggregated:
-                content = self._header_widget._content
-                stats = self.aggregate_data()
-                agg_string = (
-                    "\nSummary: "
-                    + "; ".join(
-                        [f"{key} = {value:.5g}" for key, value in stats.items()]
-                    )
-                    + "; "
-                )
-                self.update_header(content + agg_string)
+            if self.has_class("view-progress"):
+                # pressing A again while summarizing cancels the aggregation
+                self.cancel_aggregate()
+                self.notify("Summarizing cancelled", timeout=2)
+            elif not self.is_aggregated:
+                self._progress_widget.update(progress=0, total=None)
+                self.add_class("view-progress")
                 self.notify("Summarizing...", timeout=2)
-                self.is_aggregated = True
+                self.aggregate_data()
+
+    def action_toggle_distribution(self):
+        if not self.has_class("view-dataset"):
+            return
+        content = self._column1._content_widget
+        if self.has_class("view-distribution"):
+            self.remove_class("view-distribution")
+            content._distribution.clear()
+            return
+        if is_dataframe(self._data):
+            numeric = bool(distribution_fields(self._data.dtype))
+        else:
+            numeric = is_aggregatable(self._data)
+        if not numeric:
+            self.notify(
+                "Only numeric arrays and tables with numeric fields have a "
+                "distribution",
+                severity="warning",
+                timeout=2,
+            )
+            return
+        self.add_class("view-distribution")
+        content.show_distribution()
+
+    def action_export_data(self):
+        if any(
+            worker.group == "export" and worker.is_running for worker in self.workers
+        ):
+            # pressing e again while exporting cancels the export
+            self.workers.cancel_group(self, "export")
+            self.remove_class("view-progress")
+            self.notify("Export cancelled", timeout=2)
+        elif self.has_class("view-progress"):
+            self.notify(
+                "Wait for the summary to complete", severity="warning", timeout=2
+            )
+        else:
+            name = os.path.basename(self._data_path)
+            ext = ".csv" if is_dataframe(self._data) else ".npy"
+            self.push_screen(ExportScreen(name + ext), self.start_export)
+
+    def start_export(self, path):
+        """Export the displayed dataset (or selection) to `path`"""
+        if not path or not path.strip():
+            return
+        path = os.path.expanduser(path.strip())
+        if os.path.exists(path):
+            self.notify(f"{path} already exists", severity="warning", timeout=3)
+            return
+        self._progress_widget.update(progress=0, total=None)
+        self.add_class("view-progress")
+        self.export_data(self._data, path)
+
+    @work(thread=True, exclusive=True, group="export")
+    def export_data(self, data, path):
+        """Stream the data to a file on a thread worker"""
+        worker = get_current_worker()
+
+        def progress(done, total):
+            self.call_from_thread(
+                self._progress_widget.update, progress=done, total=total
+            )
+
+        try:
+            with span("export", "io"):
+                complete = export_data(
+                    data, path, progress, cancelled=lambda: worker.is_cancelled
+                )
+        except (ExportError, OSError) as err:
+            self.call_from_thread(self.finish_export, None, str(err))
+        else:
+            if complete:
+                self.call_from_thread(self.finish_export, path)
+
+    def finish_export(self, path, error=None):
+        self.remove_class("view-progress")
+        if error is not None:
+            self.notify(f"Export failed: {error}", severity="error", timeout=5)
+        else:
+            self.notify(f"Exported to {path}", timeout=3)
+
+    def action_search(self):
+        if self.search_index is None and not any(
+            worker.group == "search-index" for worker in self.workers
+        ):
+            self.build_search_index()
+        self.push_screen(SearchScreen(), self.goto_hit)
+
+    def goto_hit(self, hit):
+        """Show the group containing a search hit with the hit highlighted"""
+        if hit is None:
+            return
+        if self.has_class("view-dataset"):
+            self.action_goto_parent()
+        if hit.path == "/":
+            self._cur_dir, highlighted = "/", 0
+        else:
+            self._cur_dir, highlighted = posixpath.dirname(hit.path), hit.position
+        self._prev_highlighted = 0
+        self._column1.update_list(self.add_dir_metadata(), highlighted)
+        self.update_header(f"Path: {self._cur_dir}")
+        self._column1._selector_widget.focus()
+        self.refresh_bindings()
 
     def action_toggle_dark(self) -> None:
         self.theme = (
@@ -473,13 +2480,21 @@ class H5TUIApp(App):
             self._cur_dir = os.path.dirname(self._cur_dir)
             self._header_widget.update(f"Path: {self._cur_dir}")
             self._column1.update_list(self.add_dir_metadata(), self._prev_highlighted)
+        self.cancel_aggregate()
+        self.workers.cancel_group(self, "load")
+        self.workers.cancel_group(self, "follow")
+        self._follow_handle = None
+        self._column1._content_widget.cancel()
         self.is_aggregated = False
         self.remove_class("view-dataset")
         self.remove_class("view-plot")
         self.remove_class("view-dtable")
+        self.remove_class("view-distribution")
         self._column1._selector_widget.focus()
         # These are the default numpy print setting
         np.set_printoptions(suppress=False, threshold=1000)
+        self._truncate_print = True
+        self._suppress_print = False
         self.update_header(f"Path: {self._cur_dir}")
         self.refresh_bindings()
 
@@ -492,22 +2507,52 @@ class H5TUIApp(App):
         ):
             # Does not do anything if data is already being viewed
             return
-        highlighted = self._column1._selector_widget.highlighted
-        if highlighted is not None:
-            prompt = self._column1._selector_widget.get_option_at_index(
-                highlighted
-            ).prompt
-            selected_item = self.get_itemname_from_prompt(prompt)
-            path = os.path.join(self._cur_dir, selected_item)
-
-            if path in self._file:
-                if isinstance(self._file[path], h5py.Group):
-                    self._prev_highlighted = highlighted
-                    self._cur_dir = path
-                    self._header_widget.update(f"Path: {self._cur_dir}")
-                    self._column1.update_list(self.add_dir_metadata(), 0)
-                else:
-                    self.update_content(path)
+        item = self.selected_item()
+        if item is not None:
+            path = os.path.join(self._cur_dir, item.name)
+
+            if item.kind == GROUP:
+                self._prev_highlighted = self._column1._selector_widget.highlighted
+                self._cur_dir = path
+                self._header_widget.update(f"Path: {self._cur_dir}")
+                self._column1.update_list(self.add_dir_metadata(), 0)
+            elif item.kind == DATASET:
+                self.update_content(path)
+            elif item.kind in LINK_KINDS:
+                self.follow_link(path)
+        self.refresh_bindings()
+
+    @work(thread=True, exclusive=True, group="link")
+    def follow_link(self, path):
+        """Resolve a link on a thread worker, which may open an external file"""
+        try:
+            target = resolve_link(self._file, path, self._external_files)
+            kind = item_info(
+                target.file.id, target.path.encode("utf8"), follow_links=True
+            ).kind
+        except (LinkError, OSError) as err:
+            self.call_from_thread(
+                self.notify, f"Cannot follow link: {err}", severity="error"
+            )
+            return
+        same_file = os.path.realpath(target.file.filename) == os.path.realpath(
+            self._file.filename
+        )
+        # objects of this file are shown at their own path, such that cyclic
+        # links lead back up the tree instead of ever deeper into it. Objects
+        # of other files are browsed through the link, whose file stays open
+        self.call_from_thread(self.enter_link, target.path if same_file else path, kind)
+
+    def enter_link(self, path, kind):
+        if self.has_class("view-dataset"):
+            return
+        if kind == GROUP:
+            self._prev_highlighted = self._column1._selector_widget.highlighted
+            self._cur_dir = path
+            self._header_widget.update(f"Path: {self._cur_dir}")
+            self._column1.update_list(self.add_dir_metadata(), 0)
+        elif kind == DATASET:
+            self.update_content(path)
         self.refresh_bindings()
 
     def action_truncate_print(self):
@@ -521,7 +2566,7 @@ class H5TUIApp(App):
             else:
                 np.set_printoptions(threshold=sys.maxsize)
                 self.notify("Truncation: OFF", timeout=2)
-            self._column1._content_widget.reprint()
+            self._column1._content_widget.reformat()
 
     def action_suppress_print(self):
         """Change numpy printing by suppression"""
@@ -533,7 +2578,7 @@ class H5TUIApp(App):
             else:
                 np.set_printoptions(suppress=False)
                 self.notify("Suppression: OFF", timeout=1)
-            self._column1._content_widget.reprint()
+            self._column1._content_widget.reformat()
 
     def action_toggle_plot(self):
         if self.has_class("view-dataset"):
@@ -544,7 +2589,9 @@ class H5TUIApp(App):
                 self._column1._content_widget.replot()
             else:
                 self.notify(
-                    "Currently only 1D and 2D data is plotable", severity="warning"
+                    "Currently only 1D and 2D data is plotable, "
+                    "use : to select a slice of higher dimensional data",
+                    severity="warning",
                 )
 
 
@@ -564,12 +2611,119 @@ def check_file_validity(fname):
 
 
 def h5tui():
+    if sys.argv[1:2] == ["summary"]:
+        # headless batch mode, see h5tui.batch
+        summary(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["diff"]:
+        # headless comparison, see h5tui.compare
+        diff(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["export"]:
+        # headless export, see h5tui.export
+        export(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(description="H5TUI")
     parser.add_argument("file", type=str, action="store", help="HDF5 file")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="h5tui-trace.json",
+        metavar="TRACE",
+        help="show the time spent reading, formatting and plotting, and write a "
+        "Chrome trace to TRACE (default: h5tui-trace.json) on exit",
+    )
+    parser.add_argument(
+        "--follow",
+        nargs="?",
+        type=float,
+        const=1.0,
+        metavar="SECONDS",
+        help="open the file in SWMR mode and show the rows appended to the "
+        "displayed dataset every SECONDS (default: 1)",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="FILE",
+        help="mark the objects which differ from those of FILE, which is "
+        "compared chunk by chunk in the background",
+    )
+    parser.add_argument(
+        "--compare-path",
+        action="append",
+        metavar="PATH",
+        help="compare the group PATH of the file instead of the root, given "
+        "twice, the first PATH of the file with the second PATH of FILE",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="browse using a structure index stored next to the file, "
+        "which is built on first use and rebuilt when the file changes",
+    )
+    cache = parser.add_argument_group(
+        "file access",
+        "the chunk cache is sized from the chunk shape of every displayed "
+        "dataset, unless --rdcc-nbytes is given",
+    )
+    cache.add_argument(
+        "--rdcc-nbytes", type=int, help="size of the chunk cache in bytes"
+    )
+    cache.add_argument(
+        "--rdcc-nslots", type=int, help="number of slots of the chunk cache"
+    )
+    cache.add_argument(
+        "--rdcc-w0",
+        type=float,
+        help="preemption policy of the chunk cache, between 0 and 1",
+    )
+    cache.add_argument(
+        "--page-buf-size",
+        type=int,
+        help="size of the page buffer in bytes (files with paged file space only)",
+    )
+    cache.add_argument(
+        "--meta-block-size", type=int, help="size of metadata blocks in bytes"
+    )
+    cache.add_argument(
+        "--driver",
+        choices=FILE_DRIVERS,
+        help="HDF5 file driver, e.g. core to read small files into memory at once",
+    )
     args = parser.parse_args()
+    compare = None
+    if args.compare_path and not args.compare:
+        parser.error("--compare-path requires --compare")
+    if args.compare:
+        paths = args.compare_path or ["/"]
+        if len(paths) > 2:
+            parser.error("--compare-path is given at most twice")
+        compare = (args.compare, paths[0], paths[-1])
+    file_options = {
+        option: getattr(args, option)
+        for option in (
+            "rdcc_nbytes",
+            "rdcc_nslots",
+            "rdcc_w0",
+            "page_buf_size",
+            "meta_block_size",
+            "driver",
+        )
+        if getattr(args, option) is not None
+    }
     h5file = args.file
     if check_file_validity(h5file):
-        H5TUIApp(h5file).run()
+        profiler = enable_profiling() if args.profile else None
+        H5TUIApp(
+            h5file,
+            use_index=args.index,
+            file_options=file_options,
+            follow=args.follow,
+            compare=compare,
+        ).run()
+        if profiler is not None:
+            profiler.save(args.profile)
+            print(f"Trace written to {args.profile}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import posixpath
+import warnings
+
+import h5py
+import numpy as np
+from numpy.lib.format import descr_to_dtype, dtype_to_descr
+
+from h5tui.metadata import GROUP, GroupListing, ItemInfo
+
+INDEX_SUFFIX = ".h5tui-index"
+# bumped whenever the layout of the index changes
+INDEX_VERSION = 3
+
+
+def index_paths(fname):
+    """Locations of the index of a file: next to it, or in the user cache"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    digest = hashlib.sha1(os.path.abspath(fname).encode("utf8")).hexdigest()
+    return [
+        fname + INDEX_SUFFIX,
+        os.path.join(cache_home, "h5tui", digest + INDEX_SUFFIX),
+    ]
+
+
+def file_key(fname):
+    """Identifies the version of a file an index was built for"""
+    stat = os.stat(fname)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def walk_groups(h5file):
+    """
+    Traverse all groups of a file once, yielding their path and members
+
+    Groups which are reachable through several hard links are only
+    descended into once, which also breaks cycles. Soft and external links
+    are listed but never followed.
+    """
+    seen = set()
+    stack = ["/"]
+    while stack:
+        path = stack.pop()
+        listing = GroupListing(h5file[path])
+        items = [listing[idx] for idx in range(len(listing))]
+        yield path, items
+        for item in reversed(items):
+            if item.kind == GROUP and item.addr not in seen:
+                seen.add(item.addr)
+                stack.append(posixpath.join(path, item.name))
+
+
+def _encode_dtype(dtype):
+    """
+    Description of a dtype and of its string types, as [descr, strings]
+
+    h5py keeps the encoding of strings in the dtype metadata, which the
+    description drops. It is listed separately as [field, encoding, length]
+    for the dtype (field None) or each of its string fields.
+    """
+    with warnings.catch_warnings():
+        # the metadata dropped here is kept in `strings`
+        warnings.simplefilter("ignore")
+        descr = dtype_to_descr(dtype)
+    strings = []
+    for field in [None, *(dtype.names or ())]:
+        info = h5py.check_string_dtype(
+            dtype if field is None else dtype.fields[field][0]
+        )
+        if info is not None:
+            strings.append([field, info.encoding, info.length])
+    return [descr, strings]
+
+
+def _decode_dtype(entry):
+    descr, strings = entry
+    dtype = descr_to_dtype(_as_descr(descr))
+    fields = {}
+    for field, encoding, length in strings:
+        if field is None:
+            return h5py.string_dtype(encoding, length)
+        fields[field] = h5py.string_dtype(encoding, length)
+    if not fields:
+        return dtype
+    return np.dtype(
+        {
+            "names": list(dtype.names),
+            "formats": [
+                fields.get(name, dtype.fields[name][0]) for name in dtype.names
+            ],
+            "offsets": [dtype.fields[name][1] for name in dtype.names],
+            "itemsize": dtype.itemsize,
+        }
+    )
+
+
+def _encode_item(item):
+    dtype = None if item.dtype is None else _encode_dtype(item.dtype)
+    return item._replace(dtype=dtype)
+
+
+def _decode_item(entry):
+    item = ItemInfo(*entry)
+    return item._replace(
+        shape=None if item.shape is None else tuple(item.shape),
+        dtype=None if item.dtype is None else _decode_dtype(item.dtype),
+        chunks=None if item.chunks is None else tuple(item.chunks),
+        filters=tuple(item.filters),
+        target=None if item.target is None else tuple(item.target),
+    )
+
+
+def _as_descr(descr):
+    """Restore the tuples of a dtype description which JSON turned into lists"""
+    if isinstance(descr, list):
+        return [
+            tuple(
+                _as_descr(part) if idx == 1 else tuple(part) if idx == 2 else part
+                for idx, part in enumerate(field)
+            )
+            for field in descr
+        ]
+    return descr
+
+
+class IndexedListing:
+    """Members of a group stored in an index, decoded when accessed"""
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return _decode_item(self._entries[index])
+
+
+class StructureIndex:
+    """
+    Member listings of all groups of a file, built in a single traversal
+
+    The index can be saved next to the file (or in the user cache if that
+    location is not writable) and is reused as long as the size and
+    modification time of the file do not change.
+    """
+
+    def __init__(self, groups):
+        self._groups = groups
+
+    def __contains__(self, path):
+        return path in self._groups
+
+    def __len__(self):
+        return len(self._groups)
+
+    def listing(self, path):
+        return self._groups[path]
+
+    def groups(self):
+        return self._groups.items()
+
+    @classmethod
+    def build(cls, h5file):
+        return cls(dict(walk_groups(h5file)))
+
+    @classmethod
+    def load(cls, fname):
+        """Load the index of a file, or return None if it is missing or stale"""
+        key = file_key(fname)
+        for path in index_paths(fname):
+            try:
+                with open(path) as index_file:
+                    content = json.load(index_file)
+            except (OSError, ValueError):
+                continue
+            if content.get("version") == INDEX_VERSION and content.get("key") == key:
+                groups = {
+                    group: IndexedListing(entries)
+                    for group, entries in content["groups"].items()
+                }
+                return cls(groups)
+        return None
+
+    def save(self, fname, key):
+        """Save the index for the version `key` of a file, returns its path"""
+        content = {
+            "version": INDEX_VERSION,
+            "key": key,
+            "groups": {
+                group: [_encode_item(items[idx]) for idx in range(len(items))]
+                for group, items in self._groups.items()
+            },
+        }
+        for path in index_paths(fname):
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as index_file:
+                    json.dump(content, index_file)
+                os.replace(tmp_path, path)
+                return path
+            except OSError:
+                continue
+        return None
@@ -0,0 +1,173 @@
+from collections import OrderedDict, namedtuple
+import os
+import posixpath
+import threading
+
+import h5py
+from h5py import h5l, h5s
+
+# files pointed to by external links which are kept open
+EXTERNAL_FILES_CACHE_SIZE = 16
+# mappings of a virtual dataset listed in its preview
+VDS_PREVIEW_SOURCES = 8
+
+# the file and path of the object a link points to, `ancestor` is set if the
+# object is a group containing the link, i.e. the link forms a cycle
+LinkTarget = namedtuple("LinkTarget", ["file", "path", "ancestor"])
+
+
+class LinkError(ValueError):
+    """Raised for dangling links, and links which lead back to themselves"""
+
+
+def link_path(parent, target):
+    """
+    Absolute path of a link target, relative to the group of the link
+
+    Like HDF5, `..` is taken as a name rather than the parent group.
+    """
+    names = posixpath.join(parent, target).split("/")
+    return "/" + "/".join(name for name in names if name not in ("", "."))
+
+
+def is_ancestor(group, path):
+    """Whether a path is inside a group (or the group itself)"""
+    return group == "/" or path == group or path.startswith(group + "/")
+
+
+class ExternalFiles:
+    """
+    Pool of the files which external links point to
+
+    A file is opened when a link into it is first followed, and the most
+    recently used files are kept open. HDF5 shares an open file with the
+    external links traversed through any other file, such that browsing
+    through a link does not reopen its file on every access either.
+    """
+
+    def __init__(self, maxsize=EXTERNAL_FILES_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def locate(fname, parent):
+        """
+        Path of the file an external link of the file `parent` points to
+
+        Searched for as HDF5 does: in the directories of HDF5_EXT_PREFIX,
+        next to the file of the link, then in the working directory.
+        """
+        candidates = []
+        if not os.path.isabs(fname):
+            prefixes = os.environ.get("HDF5_EXT_PREFIX", "")
+            candidates.extend(
+                os.path.join(prefix, fname)
+                for prefix in prefixes.split(os.pathsep)
+                if prefix
+            )
+            candidates.append(os.path.join(os.path.dirname(parent), fname))
+        candidates.append(fname)
+        for path in candidates:
+            if os.path.isfile(path):
+                return os.path.realpath(path)
+        raise LinkError(f"the external file {fname} does not exist")
+
+    def open(self, fname, parent):
+        path = self.locate(fname, parent)
+        with self._lock:
+            h5file = self._files.get(path)
+            if h5file is not None:
+                self._files.move_to_end(path)
+                return h5file
+            try:
+                h5file = h5py.File(path, "r")
+            except OSError as err:
+                raise LinkError(f"cannot open the external file {fname}: {err}")
+            self._files[path] = h5file
+            if len(self._files) > self._maxsize:
+                # dropped instead of closed, objects opened from it stay valid
+                self._files.popitem(last=False)
+        return h5file
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+
+def resolve_link(h5file, path, files):
+    """
+    Follow the soft and external links from a path to the object it points to
+
+    External files are opened from the pool `files`. Returns a LinkTarget,
+    raises LinkError for dangling links and for chains of links which
+    revisit a link.
+    """
+    origin = None
+    visited = set()
+    while True:
+        parent, name = posixpath.split(path)
+        if not name:
+            break
+        try:
+            group = h5file[parent]
+            link_type = group.id.links.get_info(name.encode("utf8")).type
+        except (KeyError, RuntimeError):
+            raise LinkError(f"{path} does not exist") from None
+        # the link may live in another file than `h5file` if its group is
+        # reached through an external link
+        h5file, parent = group.file, group.name
+        path = posixpath.join(parent, name)
+        if link_type == h5l.TYPE_HARD:
+            break
+        key = (os.path.realpath(h5file.filename), path)
+        if key in visited:
+            raise LinkError(f"the links through {path} form a cycle")
+        visited.add(key)
+        if origin is None:
+            origin = key
+        if link_type == h5l.TYPE_SOFT:
+            target = group.id.links.get_val(name.encode("utf8"))
+            path = link_path(parent, target.decode("utf8"))
+        elif link_type == h5l.TYPE_EXTERNAL:
+            fname, target = group.id.links.get_val(name.encode("utf8"))
+            h5file = files.open(fname.decode("utf8"), h5file.filename)
+            path = link_path("/", target.decode("utf8"))
+        else:
+            raise LinkError("user defined links are not followed")
+    ancestor = (
+        origin is not None
+        and os.path.realpath(h5file.filename) == origin[0]
+        and is_ancestor(path, origin[1])
+    )
+    return LinkTarget(h5file, path, ancestor)
+
+
+def selection_bounds(space):
+    """Bounds of the selection of a dataspace, e.g. `[0:1, 0:10]`"""
+    if space.get_select_type() == h5s.SEL_ALL:
+        return ""
+    try:
+        start, end = space.get_select_bounds()
+    except (TypeError, ValueError, RuntimeError):
+        # unlimited selections
+        return "[...]"
+    return f"[{', '.join(f'{a}:{b + 1}' for a, b in zip(start, end))}]"
+
+
+def describe_sources(dset, limit=VDS_PREVIEW_SOURCES):
+    """
+    Lines listing which selections of the source datasets a virtual dataset
+    maps, read from its creation properties without opening the sources
+    """
+    sources = dset.virtual_sources()
+    lines = [f"Virtual dataset with {len(sources)} sources:"]
+    for vmap in sources[:limit]:
+        fname = "this file" if vmap.file_name == "." else vmap.file_name
+        lines.append(
+            f"  {selection_bounds(vmap.vspace)} <- {fname}:{vmap.dset_name}"
+            f"{selection_bounds(vmap.src_space)}"
+        )
+    if len(sources) > limit:
+        lines.append(f"  ... and {len(sources) - limit} more")
+    return lines
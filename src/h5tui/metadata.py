@@ -0,0 +1,198 @@
+from collections import OrderedDict, namedtuple
+
+from h5py import h5, h5d, h5l, h5o, h5p
+
+from h5tui.profiling import span
+
+# number of group listings kept in memory
+LISTING_CACHE_SIZE = 64
+# members of a group fetched at once, and blocks kept per group
+LISTING_BLOCK_SIZE = 256
+LISTING_CACHE_BLOCKS = 64
+
+GROUP = "group"
+DATASET = "dataset"
+DATATYPE = "datatype"
+SOFT_LINK = "soft link"
+EXTERNAL_LINK = "external link"
+# links of user defined types, which are listed but never followed
+USER_LINK = "user link"
+LINK_KINDS = (SOFT_LINK, EXTERNAL_LINK, USER_LINK)
+
+_OBJECT_KINDS = {
+    h5o.TYPE_GROUP: GROUP,
+    h5o.TYPE_DATASET: DATASET,
+    h5o.TYPE_NAMED_DATATYPE: DATATYPE,
+}
+
+# `target` is the file (None within the same file) and path a link points to,
+# `virtual` is set for virtual datasets
+ItemInfo = namedtuple(
+    "ItemInfo",
+    [
+        "name",
+        "kind",
+        "num_attrs",
+        "shape",
+        "dtype",
+        "chunks",
+        "filters",
+        "addr",
+        "target",
+        "virtual",
+    ],
+    defaults=(None, False),
+)
+
+
+def link_index_type(gid):
+    """Index in which h5py lists the members of a group"""
+    crt_order = gid.get_create_plist().get_link_creation_order()
+    if crt_order & h5p.CRT_ORDER_INDEXED:
+        return h5.INDEX_CRT_ORDER
+    return h5.INDEX_NAME
+
+
+def link_info(gid, name, link_type):
+    """Metadata of a soft, external or user defined link, which is not followed"""
+    target = None
+    if link_type == h5l.TYPE_SOFT:
+        kind = SOFT_LINK
+        target = (None, gid.links.get_val(name).decode("utf8"))
+    elif link_type == h5l.TYPE_EXTERNAL:
+        kind = EXTERNAL_LINK
+        fname, path = gid.links.get_val(name)
+        target = (fname.decode("utf8"), path.decode("utf8"))
+    else:
+        kind = USER_LINK
+    return ItemInfo(name.decode("utf8"), kind, 0, None, None, None, (), None, target)
+
+
+def item_info(gid, name, follow_links=False):
+    """
+    Collect the metadata of a member of a group
+
+    Uses the low-level API such that groups are never opened and datasets
+    only once to query their shape, dtype and storage layout. Soft and
+    external links are listed with their target instead of the object they
+    point to, unless `follow_links` is set, such that listing a group never
+    opens another file nor fails on a dangling link.
+    """
+    if not follow_links:
+        link_type = gid.links.get_info(name).type
+        if link_type != h5l.TYPE_HARD:
+            return link_info(gid, name, link_type)
+    info = h5o.get_info(gid, name)
+    kind = _OBJECT_KINDS.get(info.type)
+    shape = dtype = chunks = None
+    filters = ()
+    virtual = False
+    if kind == DATASET:
+        dsid = h5o.open(gid, name)
+        shape, dtype = dsid.shape, dsid.dtype
+        dcpl = dsid.get_create_plist()
+        layout = dcpl.get_layout()
+        if layout == h5d.CHUNKED:
+            chunks = dcpl.get_chunk()
+        # the source datasets of a virtual dataset are not opened
+        virtual = layout == h5d.VIRTUAL
+        filters = tuple(
+            dcpl.get_filter(idx)[3].decode("utf8") for idx in range(dcpl.get_nfilters())
+        )
+    return ItemInfo(
+        name.decode("utf8"),
+        kind,
+        info.num_attrs,
+        shape,
+        dtype,
+        chunks,
+        filters,
+        info.addr,
+        None,
+        virtual,
+    )
+
+
+class GroupListing:
+    """
+    Metadata of the members of a group in listing order
+
+    The members are fetched lazily from the link iterator in blocks of
+    `block_size` when first accessed, such that only the blocks around the
+    displayed rows are ever read. The most recently used blocks are kept.
+    """
+
+    def __init__(self, group, block_size=LISTING_BLOCK_SIZE):
+        self._gid = group.id
+        self._idx_type = link_index_type(self._gid)
+        self._count = len(self._gid)
+        self._block_size = block_size
+        self._blocks = OrderedDict()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        block_idx, offset = divmod(index, self._block_size)
+        block = self._blocks.get(block_idx)
+        if block is None:
+            block = self._fetch(block_idx)
+        else:
+            self._blocks.move_to_end(block_idx)
+        return block[offset]
+
+    def _fetch(self, block_idx):
+        names = []
+
+        def collect(name):
+            names.append(name)
+            # returning True stops the iteration
+            return len(names) >= self._block_size or None
+
+        with span("list group", "metadata") as counts:
+            self._gid.links.iterate(
+                collect, idx_type=self._idx_type, idx=block_idx * self._block_size
+            )
+            block = [item_info(self._gid, name) for name in names]
+            counts["objects"] = len(block)
+        self._blocks[block_idx] = block
+        if len(self._blocks) > LISTING_CACHE_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+
+class ListingCache:
+    """
+    LRU cache of group listings keyed by the path of the group
+
+    If a structure index is set, listings are taken from it instead of the
+    file whenever it contains the group.
+    """
+
+    def __init__(self, h5file, maxsize=LISTING_CACHE_SIZE):
+        self._file = h5file
+        self._maxsize = maxsize
+        self._listings = OrderedDict()
+        self._index = None
+
+    def set_index(self, index):
+        self._index = index
+        self._listings.clear()
+
+    def __getitem__(self, path):
+        if self._index is not None and path in self._index:
+            return self._index.listing(path)
+        listing = self._listings.get(path)
+        if listing is None:
+            listing = GroupListing(self._file[path])
+            self._listings[path] = listing
+            if len(self._listings) > self._maxsize:
+                self._listings.popitem(last=False)
+        else:
+            self._listings.move_to_end(path)
+        return listing
+
+    def clear(self):
+        self._listings.clear()
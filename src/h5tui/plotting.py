@@ -0,0 +1,192 @@
+import numpy as np
+
+from h5tui.reader import BLOCK_BYTES, iter_blocks, read_chunks, read_hyperslab
+
+# number of points read for the quick preview of a large dataset
+PREVIEW_POINTS = 1 << 16
+
+
+class SqueezedData:
+    """View of a dataset (or array) without its axes of length one"""
+
+    def __init__(self, data):
+        self._data = data
+        self._axes = [axis for axis, dim in enumerate(data.shape) if dim != 1]
+        self.shape = tuple(data.shape[axis] for axis in self._axes)
+        self.dtype = data.dtype
+        self.size = data.size
+        chunks = getattr(data, "chunks", None)
+        self.chunks = tuple(chunks[axis] for axis in self._axes) if chunks else None
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __getitem__(self, selection):
+        if selection is Ellipsis:
+            selection = ()
+        elif not isinstance(selection, tuple):
+            selection = (selection,)
+        full = [0] * len(self._data.shape)
+        for axis in range(len(full)):
+            if axis in self._axes:
+                full[axis] = slice(None)
+        for axis, sel in zip(self._axes, selection):
+            full[axis] = sel
+        data = read_chunks(self._data, tuple(full))
+        return self._data[tuple(full)] if data is None else data
+
+
+def initial_factor(size, num_buckets):
+    """Smallest power of two reducing `size` elements to `num_buckets`"""
+    factor = 1
+    while -(-size // factor) > num_buckets:
+        factor *= 2
+    return factor
+
+
+class SeriesDecimator:
+    """
+    Min and max of a growing 1D series in buckets of equal width
+
+    Whenever there are more than `num_buckets` buckets, their width doubles by
+    merging neighbouring buckets, such that appending elements to the series
+    only reduces the new elements. `size` is the expected size of the series.
+    """
+
+    def __init__(self, num_buckets, size=0):
+        self.num_buckets = num_buckets
+        self.width = initial_factor(size, num_buckets)
+        self.size = 0
+        self.mins = np.empty(0)
+        self.maxs = np.empty(0)
+
+    def append(self, block):
+        block = np.asarray(block, dtype=np.float64).ravel()
+        partial = self.size % self.width
+        if partial and block.size:
+            # complete the last bucket first
+            head, block = np.split(block, [self.width - partial])
+            self.mins[-1] = np.fmin(self.mins[-1], np.fmin.reduce(head))
+            self.maxs[-1] = np.fmax(self.maxs[-1], np.fmax.reduce(head))
+            self.size += head.size
+        if block.size:
+            bounds = np.arange(0, block.size, self.width)
+            self.mins = np.concatenate([self.mins, np.fmin.reduceat(block, bounds)])
+            self.maxs = np.concatenate([self.maxs, np.fmax.reduceat(block, bounds)])
+            self.size += block.size
+        while len(self.mins) > self.num_buckets:
+            pairs = np.arange(0, len(self.mins), 2)
+            self.mins = np.fmin.reduceat(self.mins, pairs)
+            self.maxs = np.fmax.reduceat(self.maxs, pairs)
+            self.width *= 2
+
+    def series(self):
+        """Positions and values of the points to plot, two per bucket"""
+        if self.width == 1:
+            return np.arange(self.size), self.mins
+        starts = np.arange(len(self.mins)) * self.width
+        ends = np.minimum(starts + self.width, self.size)
+        x = np.repeat((starts + ends) // 2, 2)
+        y = np.column_stack([self.mins, self.maxs]).ravel()
+        finite = np.isfinite(y)
+        return x[finite], y[finite]
+
+
+def decimate_1d(data, num_buckets, cancelled=None):
+    """
+    Reduce a 1D series to the min and max of at most `num_buckets` buckets
+
+    Streams over the data block by block such that spikes of any width
+    survive the reduction. Returns the SeriesDecimator of the series, or None
+    if cancelled.
+    """
+    decimator = SeriesDecimator(num_buckets, data.shape[0])
+    _, selections = iter_blocks(data)
+    for selection in selections:
+        if cancelled is not None and cancelled():
+            return None
+        decimator.append(read_hyperslab(data, selection))
+    return decimator
+
+
+def reduction_factors(shape, target):
+    """Number of elements along each axis which are reduced to a single one"""
+    return tuple(max(-(-dim // size), 1) for dim, size in zip(shape, target))
+
+
+class MatrixDecimator:
+    """
+    Means over tiles of a matrix which grows by rows
+
+    Columns are reduced by a fixed factor, and rows by a factor which doubles
+    (merging neighbouring rows of tiles) whenever there are more rows of
+    tiles than targeted, such that appending rows only reduces the new rows.
+    NaNs are ignored when averaging.
+    """
+
+    def __init__(self, target, ncols, nrows=0):
+        self.target_rows, target_cols = target
+        self.ncols = ncols
+        self.col_factor = max(-(-ncols // target_cols), 1)
+        self.row_factor = initial_factor(nrows, self.target_rows)
+        self.nrows = 0
+        out_cols = -(-ncols // self.col_factor)
+        self.sums = np.empty((0, out_cols))
+        self.counts = np.empty((0, out_cols))
+
+    def _reduce(self, block):
+        """Sums and counts of the tiles of a block of whole rows of tiles"""
+        out_rows = -(-len(block) // self.row_factor)
+        out_cols = self.sums.shape[1]
+        # pad to whole tiles, the padding is ignored when averaging
+        padded = np.full(
+            (out_rows * self.row_factor, out_cols * self.col_factor), np.nan
+        )
+        padded[: len(block), : self.ncols] = block
+        tiles = padded.reshape(out_rows, self.row_factor, out_cols, self.col_factor)
+        valid = ~np.isnan(tiles)
+        return np.where(valid, tiles, 0).sum(axis=(1, 3)), valid.sum(axis=(1, 3))
+
+    def append(self, block):
+        block = np.asarray(block, dtype=np.float64).reshape(-1, self.ncols)
+        partial = self.nrows % self.row_factor
+        if partial and len(block):
+            # complete the last row of tiles first
+            head, block = np.split(block, [self.row_factor - partial])
+            sums, counts = self._reduce(head)
+            self.sums[-1] += sums[0]
+            self.counts[-1] += counts[0]
+            self.nrows += len(head)
+        if len(block):
+            sums, counts = self._reduce(block)
+            self.sums = np.concatenate([self.sums, sums])
+            self.counts = np.concatenate([self.counts, counts])
+            self.nrows += len(block)
+        while len(self.sums) > self.target_rows:
+            pairs = np.arange(0, len(self.sums), 2)
+            self.sums = np.add.reduceat(self.sums, pairs)
+            self.counts = np.add.reduceat(self.counts, pairs)
+            self.row_factor *= 2
+
+    def matrix(self):
+        with np.errstate(invalid="ignore"):
+            return self.sums / self.counts
+
+
+def decimate_2d(data, target, cancelled=None):
+    """
+    Reduce a 2D array to at most `target` by averaging blocks of elements
+
+    Streams over blocks of rows such that only the reduced array is kept in
+    memory. Returns the MatrixDecimator of the array, or None if cancelled.
+    """
+    nrows, ncols = data.shape
+    decimator = MatrixDecimator(target, ncols, nrows)
+    row_nbytes = max(ncols * data.dtype.itemsize, 1)
+    rows_per_block = max(BLOCK_BYTES // row_nbytes, 1)
+    for start in range(0, nrows, rows_per_block):
+        if cancelled is not None and cancelled():
+            return None
+        decimator.append(read_hyperslab(data, np.s_[start : start + rows_per_block]))
+    return decimator
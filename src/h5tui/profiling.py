@@ -0,0 +1,121 @@
+from contextlib import contextmanager, nullcontext
+import functools
+import json
+import os
+import threading
+import time
+
+# categories of the recorded spans, in the order they are displayed
+CATEGORIES = ("metadata", "io", "format", "plot", "aggregate", "ui")
+
+_profiler = None
+
+
+class Profiler:
+    """
+    Records the duration of spans of work together with the bytes and
+    objects they read, from any thread
+
+    The spans are kept in memory and written in the Chrome trace event
+    format, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._totals = {}
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """Time the enclosed block, the yielded dict counts bytes and objects"""
+        counts = {"bytes": 0, "objects": 0}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(
+                name, category, start, time.perf_counter() - start, counts, args
+            )
+
+    def record(self, name, category, start, duration, counts=None, args=None):
+        """Record a span which started at the `time.perf_counter()` `start`"""
+        counts = counts or {"bytes": 0, "objects": 0}
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {**(args or {}), **counts},
+        }
+        with self._lock:
+            self._events.append(event)
+            total = self._totals.setdefault(
+                category, {"count": 0, "seconds": 0.0, "bytes": 0, "objects": 0}
+            )
+            total["count"] += 1
+            total["seconds"] += duration
+            total["bytes"] += counts["bytes"]
+            total["objects"] += counts["objects"]
+
+    def totals(self):
+        """Number of spans, time, bytes and objects per category"""
+        with self._lock:
+            return {category: dict(total) for category, total in self._totals.items()}
+
+    def save(self, path):
+        with self._lock:
+            trace = {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+        with open(path, "w") as trace_file:
+            json.dump(trace, trace_file)
+
+
+def enable_profiling():
+    """Start recording the spans of the whole process"""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def span(name, category, **args):
+    """Record a span if profiling is enabled, see Profiler.span"""
+    if _profiler is None:
+        return nullcontext({"bytes": 0, "objects": 0})
+    return _profiler.span(name, category, **args)
+
+
+def traced(name, category):
+    """Decorator recording every call of a function as a span"""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def format_totals(totals):
+    """One line summary of the totals of every category"""
+    parts = []
+    for category in CATEGORIES:
+        total = totals.get(category)
+        if total is None:
+            continue
+        part = f"{category}: {total['count']}x {total['seconds'] * 1e3:.0f} ms"
+        if total["bytes"]:
+            part += f" {total['bytes'] / (1 << 20):.1f} MiB"
+        if total["objects"]:
+            part += f" {total['objects']} obj"
+        parts.append(part)
+    return " | ".join(parts) or "No activity recorded yet"
@@ -0,0 +1,522 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+import threading
+import zlib
+
+import h5py
+from h5py import h5d, h5p, h5z
+import numpy as np
+
+try:
+    import lzf
+except ImportError:
+    lzf = None
+
+from h5tui.profiling import span
+
+# datasets above this size are paged instead of being read in full
+PAGING_THRESHOLD_BYTES = 1 << 20
+# upper bound on the memory held by the page cache of a single dataset
+PAGE_CACHE_BYTES = 64 << 20
+# target size of the blocks used when streaming over a whole dataset
+BLOCK_BYTES = 32 << 20
+# upper bound on the memory held by prefetched datasets
+PREFETCH_CACHE_BYTES = 64 << 20
+# bounds of the chunk cache sized for a dataset, see chunk_cache_size()
+DEFAULT_CHUNK_CACHE_BYTES = 1 << 20
+MAX_CHUNK_CACHE_BYTES = 256 << 20
+MAX_CHUNK_CACHE_SLOTS = 1 << 20
+CHUNK_CACHE_W0 = 0.75
+# reads of compressed datasets above this size decompress chunks in parallel
+PARALLEL_READ_BYTES = 8 << 20
+# threads decompressing chunks, zlib and lzf release the GIL
+DECOMPRESS_WORKERS = min(os.cpu_count() or 1, 32)
+# filters which can be undone outside of HDF5
+PARALLEL_FILTERS = {h5z.FILTER_DEFLATE, h5z.FILTER_SHUFFLE}
+if lzf is not None:
+    PARALLEL_FILTERS.add(h5z.FILTER_LZF)
+# drivers which can be selected without further options
+FILE_DRIVERS = [
+    driver
+    for driver in ("sec2", "stdio", "core", "direct")
+    if driver in h5py.registered_drivers()
+]
+
+
+def open_file(fname, **options):
+    """
+    Open a file for reading with the given file access options
+
+    The page buffer can only be used with files created with the paged
+    file space strategy, for other files it is disabled.
+    """
+    try:
+        return h5py.File(fname, "r", **options)
+    except OSError:
+        if not options.get("page_buf_size"):
+            raise
+        options.pop("page_buf_size")
+        return h5py.File(fname, "r", **options)
+
+
+def next_prime(number):
+    """Smallest prime not below `number`, as recommended for hash table slots"""
+    candidate = max(number, 2)
+    while any(candidate % div == 0 for div in range(2, int(candidate**0.5) + 1)):
+        candidate += 1
+    return candidate
+
+
+def chunk_cache_size(dset):
+    """
+    Size of a chunk cache holding two rows of chunks of a dataset
+
+    Paging reads rows which are spread over every chunk of a row of chunks,
+    so the previous and current rows of chunks are kept decompressed.
+    Returns the number of slots and bytes of the cache, or None if the
+    default cache is large enough (or the chunks too large to be cached).
+    """
+    if not dset.chunks:
+        return None
+    chunk_nbytes = int(np.prod(dset.chunks)) * dset.dtype.itemsize
+    row_chunks = int(
+        np.prod([-(-dim // size) for dim, size in zip(dset.shape[1:], dset.chunks[1:])])
+    )
+    nbytes = 2 * row_chunks * chunk_nbytes
+    if nbytes <= DEFAULT_CHUNK_CACHE_BYTES or chunk_nbytes > MAX_CHUNK_CACHE_BYTES:
+        return None
+    nbytes = min(nbytes, MAX_CHUNK_CACHE_BYTES)
+    nslots = next_prime(min(100 * (nbytes // chunk_nbytes), MAX_CHUNK_CACHE_SLOTS))
+    return nslots, nbytes
+
+
+def open_dataset(h5file, path, w0=CHUNK_CACHE_W0):
+    """Open a dataset with a chunk cache sized from its chunk shape"""
+    dset = h5file[path]
+    cache = chunk_cache_size(dset)
+    if cache is None:
+        return dset
+    nslots, nbytes = cache
+    dapl = h5p.create(h5p.DATASET_ACCESS)
+    dapl.set_chunk_cache(nslots, nbytes, w0)
+    return h5py.Dataset(h5d.open(h5file.id, path.encode("utf8"), dapl=dapl))
+
+
+_decompress_pool = None
+_decompress_pool_lock = threading.Lock()
+
+
+def decompress_pool():
+    """Thread pool shared by all parallel reads"""
+    global _decompress_pool
+    with _decompress_pool_lock:
+        if _decompress_pool is None:
+            _decompress_pool = ThreadPoolExecutor(
+                max_workers=DECOMPRESS_WORKERS, thread_name_prefix="h5tui-decompress"
+            )
+        return _decompress_pool
+
+
+def disable_parallel_reads():
+    """Decompress chunks on the reading thread, e.g. in worker processes"""
+    global DECOMPRESS_WORKERS
+    DECOMPRESS_WORKERS = 1
+
+
+def chunk_filters(dset):
+    """
+    Filter pipeline of a compressed dataset, if all its filters can be undone
+    outside of HDF5, as a list of filter codes. Returns None otherwise.
+    """
+    if not isinstance(dset, h5py.Dataset) or dset.chunks is None:
+        return None
+    if dset.dtype.kind not in "biufc":
+        return None
+    plist = dset.id.get_create_plist()
+    filters = [plist.get_filter(idx)[0] for idx in range(plist.get_nfilters())]
+    if not set(filters) - {h5z.FILTER_SHUFFLE} or not set(filters) <= PARALLEL_FILTERS:
+        return None
+    return filters
+
+
+def selection_bounds(selection, shape):
+    """
+    Start and stop on every axis of a selection of a contiguous block, and the
+    axes indexed by an integer. Returns None for other selections.
+    """
+    if selection is Ellipsis:
+        selection = ()
+    elif not isinstance(selection, tuple):
+        selection = (selection,)
+    ellipses = [pos for pos, index in enumerate(selection) if index is Ellipsis]
+    if len(ellipses) > 1:
+        return None
+    if ellipses:
+        pos = ellipses[0]
+        fill = (slice(None),) * (len(shape) - len(selection) + 1)
+        selection = selection[:pos] + fill + selection[pos + 1 :]
+    if len(selection) > len(shape):
+        return None
+    selection = selection + (slice(None),) * (len(shape) - len(selection))
+
+    bounds, dropped = [], []
+    for axis, (index, dim) in enumerate(zip(selection, shape)):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(dim)
+            if step != 1:
+                return None
+            bounds.append((start, max(stop, start)))
+        elif isinstance(index, (int, np.integer)) and -dim <= index < dim:
+            index = int(index) % dim
+            bounds.append((index, index + 1))
+            dropped.append(axis)
+        else:
+            return None
+    return bounds, dropped
+
+
+def unshuffle(raw, itemsize):
+    """Undo the shuffle filter, which groups the n-th bytes of all elements"""
+    data = np.frombuffer(raw, np.uint8)
+    size = len(data) // itemsize * itemsize
+    out = np.empty_like(data)
+    out[:size] = data[:size].reshape(itemsize, -1).T.ravel()
+    # trailing bytes which do not form an element are left as they are
+    out[size:] = data[size:]
+    return out
+
+
+def decode_chunk(raw, filters, filter_mask, dset):
+    """Undo the filters applied to a raw chunk, in reverse order"""
+    for position in reversed(range(len(filters))):
+        if filter_mask & (1 << position):
+            continue
+        code = filters[position]
+        if code == h5z.FILTER_DEFLATE:
+            raw = zlib.decompress(raw)
+        elif code == h5z.FILTER_LZF:
+            nbytes = int(np.prod(dset.chunks)) * dset.dtype.itemsize
+            raw = lzf.decompress(raw, nbytes)
+        elif code == h5z.FILTER_SHUFFLE:
+            raw = unshuffle(raw, dset.dtype.itemsize)
+    return np.frombuffer(raw, dset.dtype).reshape(dset.chunks)
+
+
+def read_chunks(dset, selection=Ellipsis):
+    """
+    Read a large selection of a compressed dataset decompressing its chunks in
+    parallel
+
+    HDF5 decompresses the chunks of a read one after the other on a single
+    core. Here the raw chunks are read with `read_direct_chunk`, decompressed
+    on a thread pool and copied into the preallocated result. Returns None if
+    the dataset, its filters or the selection are not supported, or if the
+    selection is too small to benefit from it.
+    """
+    if DECOMPRESS_WORKERS < 2:
+        return None
+    filters = chunk_filters(dset)
+    if filters is None:
+        return None
+    region = selection_bounds(selection, dset.shape)
+    if region is None:
+        return None
+    bounds, dropped = region
+    shape = tuple(stop - start for start, stop in bounds)
+    if int(np.prod(shape)) * dset.dtype.itemsize < PARALLEL_READ_BYTES:
+        return None
+
+    grid = [
+        range(start // chunk, -(-stop // chunk))
+        for (start, stop), chunk in zip(bounds, dset.chunks)
+    ]
+    out = np.empty(shape, dset.dtype)
+
+    def read_chunk(coords):
+        offset = tuple(idx * chunk for idx, chunk in zip(coords, dset.chunks))
+        # parts of the chunk and of the result where they overlap
+        src, dst = [], []
+        for (start, stop), chunk_start, chunk in zip(bounds, offset, dset.chunks):
+            lo, hi = max(start, chunk_start), min(stop, chunk_start + chunk)
+            src.append(slice(lo - chunk_start, hi - chunk_start))
+            dst.append(slice(lo - start, hi - start))
+        if dset.id.get_chunk_info_by_coord(offset).byte_offset is None:
+            # chunks which were never written hold the fill value
+            out[tuple(dst)] = dset.fillvalue
+            return
+        filter_mask, raw = dset.id.read_direct_chunk(offset)
+        out[tuple(dst)] = decode_chunk(raw, filters, filter_mask, dset)[tuple(src)]
+
+    pool = decompress_pool()
+    for future in [
+        pool.submit(read_chunk, coords) for coords in itertools.product(*grid)
+    ]:
+        future.result()
+    return out[
+        tuple(0 if axis in dropped else slice(None) for axis in range(len(shape)))
+    ]
+
+
+def read_hyperslab(dset, selection=Ellipsis):
+    """Read a selection of a dataset into memory, see read_chunks"""
+    with span("read", "io") as counts:
+        data = read_chunks(dset, selection)
+        if data is None:
+            data = dset[selection]
+        counts["bytes"] = getattr(data, "nbytes", 0)
+    return data
+
+
+def dataset_nbytes(dset):
+    return dset.size * dset.dtype.itemsize
+
+
+def needs_paging(dset):
+    """Checks if a dataset is too large to be read in one go"""
+    return (
+        len(dset.shape) > 0
+        and len(dset.dtype) == 0
+        and dataset_nbytes(dset) > PAGING_THRESHOLD_BYTES
+    )
+
+
+def get_colnames(obj):
+    """Return the column names of numpy recarray"""
+    return obj.dtype.names
+
+
+def decode_fields(block):
+    """Decode all string fields of a block of a recarray at once"""
+    names = get_colnames(block)
+    columns = [block[name] for name in names]
+    is_string = [h5py.check_string_dtype(col.dtype) is not None for col in columns]
+    if not any(is_string):
+        return block
+    columns = [
+        np.char.decode(col.astype(np.bytes_), "utf8", "replace") if string else col
+        for col, string in zip(columns, is_string)
+    ]
+    dtype = [
+        (name, col.dtype) if string else (name, block.dtype.fields[name][0])
+        for name, col, string in zip(names, columns, is_string)
+    ]
+    decoded = np.empty(block.shape, dtype=dtype)
+    for name, col in zip(names, columns):
+        decoded[name] = col
+    return decoded
+
+
+class DatasetPager:
+    """
+    Reads a dataset lazily in pages of rows along its first axis
+
+    Only the pages covering the requested window (plus `readahead` pages in
+    each direction) are read from the file. Pages are kept in a LRU cache
+    which is bounded by `max_bytes`. Windows may be requested from several
+    threads at once. If given, `transform` is applied to every page once it
+    has been read.
+    """
+
+    def __init__(
+        self, dset, page_len, readahead=1, max_bytes=PAGE_CACHE_BYTES, transform=None
+    ):
+        self._dset = dset
+        self._transform = transform
+        self._readahead = readahead
+        self._max_bytes = max_bytes
+        self._pages = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+        row_nbytes = max(dataset_nbytes(dset) // max(dset.shape[0], 1), 1)
+        # a page (with its read ahead neighbours) should always fit the cache
+        max_page_len = max_bytes // ((2 * readahead + 2) * row_nbytes)
+        self.page_len = max(1, min(int(page_len), max_page_len))
+
+    @property
+    def dataset(self):
+        return self._dset
+
+    @property
+    def nrows(self):
+        return self._dset.shape[0]
+
+    @property
+    def nbytes(self):
+        """Memory held by the cached pages"""
+        return self._cached_bytes
+
+    def _get_page(self, idx):
+        page = self._pages.get(idx)
+        if page is not None:
+            self._pages.move_to_end(idx)
+            return page
+
+        start = idx * self.page_len
+        stop = min(start + self.page_len, self.nrows)
+        page = read_hyperslab(self._dset, np.s_[start:stop])
+        if self._transform is not None:
+            page = self._transform(page)
+        self._pages[idx] = page
+        self._cached_bytes += page.nbytes
+        return page
+
+    def _evict(self, keep):
+        for idx in list(self._pages):
+            if self._cached_bytes <= self._max_bytes:
+                break
+            if idx not in keep:
+                self._cached_bytes -= self._pages.pop(idx).nbytes
+
+    def invalidate(self, start):
+        """Drop the cached pages from row `start` on, e.g. after the dataset grew"""
+        with self._lock:
+            for idx in list(self._pages):
+                if (idx + 1) * self.page_len > start:
+                    self._cached_bytes -= self._pages.pop(idx).nbytes
+
+    def window(self, start, stop):
+        """Return the rows [start, stop) of the dataset"""
+        with self._lock:
+            return self._window(start, stop)
+
+    def cached_window(self, start, stop):
+        """
+        Return the rows [start, stop) if all their pages are cached, None
+        otherwise or while another thread is reading, without any read
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            start = min(max(start, 0), self.nrows)
+            stop = min(max(stop, start), self.nrows)
+            first = start // self.page_len
+            last = max(stop - 1, start) // self.page_len
+            pages = [self._pages.get(idx) for idx in range(first, last + 1)]
+            if any(page is None for page in pages):
+                return None
+            for idx in range(first, last + 1):
+                self._pages.move_to_end(idx)
+        finally:
+            self._lock.release()
+        data = pages[0] if len(pages) == 1 else np.concatenate(pages)
+        offset = first * self.page_len
+        return data[start - offset : stop - offset]
+
+    def _window(self, start, stop):
+        start = min(max(start, 0), self.nrows)
+        stop = min(max(stop, start), self.nrows)
+        if start == stop:
+            return read_hyperslab(self._dset, np.s_[start:stop])
+
+        first = start // self.page_len
+        last = (stop - 1) // self.page_len
+        pages = [self._get_page(idx) for idx in range(first, last + 1)]
+
+        num_pages = -(-self.nrows // self.page_len)
+        ahead = [
+            idx
+            for offset in range(1, self._readahead + 1)
+            for idx in (first - offset, last + offset)
+            if 0 <= idx < num_pages
+        ]
+        for idx in ahead:
+            self._get_page(idx)
+        self._evict(keep=set(range(first, last + 1)))
+
+        data = pages[0] if len(pages) == 1 else np.concatenate(pages)
+        offset = first * self.page_len
+        return data[start - offset : stop - offset]
+
+
+class PrefetchCache:
+    """
+    LRU cache of datasets read ahead of being displayed, keyed by path
+
+    Entries are either small datasets read in full, DatasetPagers whose
+    first page has been read, or datasets which are read as they are
+    displayed. The cache is bounded by `max_bytes` and may be used from
+    several threads at once.
+    """
+
+    def __init__(self, max_bytes=PREFETCH_CACHE_BYTES):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._entries
+
+    @staticmethod
+    def entry_nbytes(entry):
+        """Memory held by an entry, the nbytes of a dataset is its size on disk"""
+        if isinstance(entry, (np.ndarray, DatasetPager)):
+            return entry.nbytes
+        return 0
+
+    def put(self, path, entry):
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while (
+                len(self._entries) > 1
+                and sum(map(self.entry_nbytes, self._entries.values()))
+                > self._max_bytes
+            ):
+                self._entries.popitem(last=False)
+
+    def take(self, path):
+        """Remove and return the entry of a path, None if it is not cached"""
+        with self._lock:
+            return self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def block_rows(shape, itemsize, chunks=None, block_bytes=BLOCK_BYTES):
+    """
+    Number of rows along the first axis of a block of about `block_bytes`
+
+    Blocks are a multiple of the chunk rows, unless a single row of chunks
+    is larger than a block.
+    """
+    row_nbytes = max(int(np.prod(shape[1:])), 1) * itemsize
+    chunk_rows = chunks[0] if chunks else 1
+    if chunk_rows * row_nbytes > block_bytes:
+        return max(block_bytes // row_nbytes, 1)
+    return max(block_bytes // row_nbytes // chunk_rows, 1) * chunk_rows
+
+
+def iter_blocks(data, block_bytes=BLOCK_BYTES, whole_rows=False):
+    """
+    Split a dataset (or array) into selections which are read one at a time
+
+    Returns the number of blocks and an iterator over their selections.
+    Blocks span whole rows along the first axis and are aligned to the chunk
+    layout of the dataset, such that every chunk is read exactly once.
+    Chunks too large to be grouped into rows are visited one by one, unless
+    `whole_rows` is set, in which case blocks are cut across such chunks.
+    """
+    if len(data.shape) == 0:
+        return 1, iter([Ellipsis])
+
+    nrows = data.shape[0]
+    row_nbytes = max(data.size // max(nrows, 1), 1) * data.dtype.itemsize
+    chunks = getattr(data, "chunks", None)
+    if (
+        chunks
+        and chunks[0] * row_nbytes > block_bytes
+        and not whole_rows
+        and hasattr(data, "iter_chunks")
+    ):
+        num_chunks = int(np.prod([-(-dim // c) for dim, c in zip(data.shape, chunks)]))
+        return num_chunks, data.iter_chunks()
+
+    rows = block_rows(data.shape, data.dtype.itemsize, chunks, block_bytes)
+    starts = range(0, nrows, rows)
+    return len(starts), (np.s_[start : start + rows] for start in starts)
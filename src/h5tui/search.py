@@ -0,0 +1,168 @@
+from array import array
+import posixpath
+
+import numpy as np
+
+from h5tui.index import walk_groups
+
+# number of hits returned by a single query
+SEARCH_MAX_RESULTS = 200
+# fraction of the trigrams of a query which a hit must contain
+FUZZY_MIN_SHARE = 0.6
+# attribute values with more elements are only indexed by their key
+ATTR_VALUE_MAX_ELEMENTS = 64
+ATTR_VALUE_MAX_CHARS = 200
+
+
+def trigrams(text):
+    """Set of the substrings of length three of a text"""
+    return {text[idx : idx + 3] for idx in range(len(text) - 2)}
+
+
+def format_attr_value(value):
+    if isinstance(value, bytes):
+        value = value.decode("utf8", "replace")
+    return str(value).replace("\n", " ")[:ATTR_VALUE_MAX_CHARS]
+
+
+def iter_attributes(obj):
+    """Yield the keys and formatted (small) values of the attributes of an object"""
+    attrs = obj.attrs
+    for key in attrs:
+        value = ""
+        shape = attrs.get_id(key).shape
+        if shape is None or int(np.prod(shape)) <= ATTR_VALUE_MAX_ELEMENTS:
+            try:
+                value = format_attr_value(attrs[key])
+            except (OSError, TypeError, ValueError):
+                # attributes of types which h5py cannot read are only listed
+                pass
+        yield key, value
+
+
+class SearchHit:
+    """An object, or an attribute of an object, matching a query"""
+
+    def __init__(self, path, position, key=None, value=None):
+        self.path = path
+        # position of the object in the listing of its group
+        self.position = position
+        self.key = key
+        self.value = value
+
+    def __str__(self):
+        if self.key is None:
+            return self.path
+        return f"{self.path}  @{self.key} = {self.value}"
+
+
+class SearchIndex:
+    """
+    Trigram index over the paths and attributes of all objects of a file
+
+    Every object and every attribute (as `key=value`) is one entry. A query
+    intersects the posting lists of its trigrams, such that only the entries
+    sharing most of them are ranked, independently of the size of the file.
+    Entries missing some of the trigrams still match, which tolerates typos.
+    """
+
+    def __init__(self):
+        self._paths = []
+        self._positions = []
+        self._keys = []
+        self._values = []
+        self._texts = []
+        self._postings = {}
+        self._lengths = np.zeros(0, dtype=int)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _add(self, path, position, key=None, value=None):
+        entry = len(self._texts)
+        text = path if key is None else f"{key}={value}"
+        text = text.lower()
+        self._paths.append(path)
+        self._positions.append(position)
+        self._keys.append(key)
+        self._values.append(value)
+        self._texts.append(text)
+        for gram in trigrams(text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("i")
+            posting.append(entry)
+
+    def _add_object(self, h5file, path, position, num_attrs):
+        self._add(path, position)
+        if num_attrs > 0:
+            for key, value in iter_attributes(h5file[path]):
+                self._add(path, position, key, value)
+
+    @classmethod
+    def build(cls, h5file, groups=None, cancelled=None):
+        """
+        Index all objects of a file in a single traversal
+
+        The members of the groups are taken from `groups` (pairs of a path
+        and its listing, see `walk_groups`) if given, such that only the
+        attributes are read from the file. Returns None if cancelled.
+        """
+        index = cls()
+        index._add_object(h5file, "/", None, len(h5file.attrs))
+        if groups is None:
+            groups = walk_groups(h5file)
+        for group, listing in groups:
+            if cancelled is not None and cancelled():
+                return None
+            for position in range(len(listing)):
+                item = listing[position]
+                path = posixpath.join(group, item.name)
+                index._add_object(h5file, path, position, item.num_attrs)
+        index._lengths = np.array([len(text) for text in index._texts])
+        return index
+
+    def _hit(self, entry):
+        return SearchHit(
+            self._paths[entry],
+            self._positions[entry],
+            self._keys[entry],
+            self._values[entry],
+        )
+
+    def search(self, query, limit=SEARCH_MAX_RESULTS):
+        """Return the best hits of a query, best first"""
+        query = query.strip().lower()
+        grams = trigrams(query)
+        if not query:
+            return []
+        if not grams:
+            # too short to be indexed, look for it in order
+            hits = []
+            for entry, text in enumerate(self._texts):
+                if query in text:
+                    hits.append(self._hit(entry))
+                    if len(hits) == limit:
+                        break
+            return hits
+
+        postings = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not postings:
+            return []
+        counts = np.bincount(
+            np.concatenate(
+                [np.frombuffer(posting, dtype=np.intc) for posting in postings]
+            ),
+            minlength=len(self._texts),
+        )
+        required = max(int(np.ceil(FUZZY_MIN_SHARE * len(grams))), 1)
+        candidates = np.flatnonzero(counts >= required)
+        # most shared trigrams first, then the shortest entries
+        order = np.lexsort((self._lengths[candidates], -counts[candidates]))
+        ranked = candidates[order[: 4 * limit]]
+        # among those, exact substrings come first
+        ranked = sorted(
+            ranked.tolist(),
+            key=lambda entry: (-counts[entry], query not in self._texts[entry]),
+        )
+        return [self._hit(entry) for entry in ranked[:limit]]
@@ -0,0 +1,173 @@
+import ast
+
+import numpy as np
+
+from h5tui.reader import read_chunks
+
+
+class SelectionError(ValueError):
+    """Raised for selection expressions which are invalid for a dataset"""
+
+
+def _evaluate(node):
+    """Value of a node of the restricted expression grammar"""
+    # the index of subscripts is wrapped before Python 3.9
+    if type(node).__name__ == "Index":
+        return _evaluate(node.value)
+    if type(node).__name__ == "ExtSlice":
+        return tuple(_evaluate(dim) for dim in node.dims)
+    if isinstance(node, ast.Constant) and (
+        isinstance(node.value, (int, str)) or node.value is Ellipsis
+    ):
+        return node.value
+    if (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.USub)
+        and isinstance(node.operand, ast.Constant)
+        and isinstance(node.operand.value, int)
+    ):
+        return -node.operand.value
+    if isinstance(node, ast.Slice):
+        return slice(
+            *(
+                None if part is None else _evaluate(part)
+                for part in (node.lower, node.upper, node.step)
+            )
+        )
+    if isinstance(node, ast.Tuple):
+        return tuple(_evaluate(elt) for elt in node.elts)
+    if isinstance(node, ast.List):
+        return [_evaluate(elt) for elt in node.elts]
+    raise SelectionError(
+        "only integers, slices, lists of integers and field names are allowed"
+    )
+
+
+def parse_selection(text):
+    """
+    Parse a numpy style selection such as `[100:200, ::10, 5]`
+
+    Strings (or lists of strings) select fields of compound datasets, e.g.
+    `[0:10, 'x', 'y']`. Returns the index selection and the field names.
+    """
+    text = text.strip()
+    if not text:
+        return (), []
+    if not (text.startswith("[") and text.endswith("]")):
+        text = f"[{text}]"
+    try:
+        tree = ast.parse(f"_{text}", mode="eval")
+    except SyntaxError as err:
+        raise SelectionError(f"invalid selection: {err.msg}") from None
+    if not isinstance(tree.body, ast.Subscript):
+        raise SelectionError("a selection must be a single subscript")
+
+    items = _evaluate(tree.body.slice)
+    if not isinstance(items, tuple):
+        items = (items,)
+    indices, fields = [], []
+    for item in items:
+        if isinstance(item, str):
+            fields.append(item)
+        elif isinstance(item, list) and item and all(isinstance(x, str) for x in item):
+            fields.extend(item)
+        else:
+            indices.append(item)
+    return tuple(indices), fields
+
+
+def _normalize(index, dim, axis):
+    """Index of an axis as an int, a range or an increasing list"""
+    if isinstance(index, slice):
+        if index.step is not None and index.step <= 0:
+            raise SelectionError(f"axis {axis}: only positive steps are supported")
+        return range(dim)[index]
+    if isinstance(index, int):
+        if not -dim <= index < dim:
+            raise SelectionError(f"axis {axis}: index {index} out of range")
+        return index % dim
+    if isinstance(index, list) and all(isinstance(x, int) for x in index):
+        points = [x % dim if -dim <= x < dim else None for x in index]
+        if None in points:
+            raise SelectionError(f"axis {axis}: index out of range")
+        if any(b <= a for a, b in zip(points, points[1:])):
+            raise SelectionError(f"axis {axis}: indices must be increasing")
+        return points
+    raise SelectionError(f"axis {axis}: unsupported index {index!r}")
+
+
+def _as_index(spec):
+    """Convert the index of an axis to what h5py accepts"""
+    if isinstance(spec, range):
+        if len(spec) == 0:
+            return slice(spec.start, spec.start)
+        return slice(spec.start, spec[-1] + 1, spec.step)
+    return spec
+
+
+class DatasetView:
+    """
+    Selection of a dataset (or array) which is read lazily
+
+    Behaves like a dataset of the selected shape and fields: indexing the
+    view composes the selections such that only the requested part of the
+    selected hyperslab is read from the file.
+    """
+
+    def __init__(self, data, indices=(), fields=()):
+        self._data = data
+        shape = data.shape
+        if Ellipsis in indices:
+            pos = indices.index(Ellipsis)
+            fill = (slice(None),) * (len(shape) - len(indices) + 1)
+            indices = indices[:pos] + fill + indices[pos + 1 :]
+        if len(indices) > len(shape):
+            raise SelectionError(
+                f"too many indices: the dataset has {len(shape)} dimensions"
+            )
+        indices = tuple(indices) + (slice(None),) * (len(shape) - len(indices))
+        self._specs = [
+            _normalize(index, dim, axis)
+            for axis, (index, dim) in enumerate(zip(indices, shape))
+        ]
+        if sum(isinstance(spec, list) for spec in self._specs) > 1:
+            raise SelectionError("only a single axis may be indexed by a list")
+        # axes of the view, the axes indexed by an int are dropped
+        self._axes = [
+            axis for axis, spec in enumerate(self._specs) if not isinstance(spec, int)
+        ]
+        self.shape = tuple(len(self._specs[axis]) for axis in self._axes)
+        self.size = int(np.prod(self.shape))
+        self.chunks = None
+
+        self._fields = list(fields)
+        names = data.dtype.names or ()
+        for name in self._fields:
+            if name not in names:
+                raise SelectionError(f"no field named {name!r}")
+        if len(self._fields) == 1:
+            self.dtype = data.dtype.fields[self._fields[0]][0]
+            if self.dtype.shape:
+                raise SelectionError("subarray fields cannot be selected alone")
+        elif self._fields:
+            self.dtype = np.dtype(
+                [(name, data.dtype.fields[name][0]) for name in self._fields]
+            )
+        else:
+            self.dtype = data.dtype
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __getitem__(self, selection):
+        if selection is Ellipsis:
+            selection = ()
+        elif not isinstance(selection, tuple):
+            selection = (selection,)
+        specs = list(self._specs)
+        for axis, sub in zip(self._axes, selection):
+            specs[axis] = specs[axis][sub]
+        index = tuple(_as_index(spec) for spec in specs)
+        data = None if self._fields else read_chunks(self._data, index)
+        return self._data[index + tuple(self._fields)] if data is None else data
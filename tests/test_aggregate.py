@@ -0,0 +1,57 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from h5tui.aggregate import RunningStats, aggregate_stats
+
+
+def merged(blocks):
+    stats = RunningStats()
+    for block in blocks:
+        stats.merge(RunningStats.from_array(block))
+    return stats
+
+
+def test_merge_matches_numpy():
+    data = np.random.default_rng(0).normal(size=1000)
+    summary = merged(np.array_split(data, 7)).summary()
+    assert summary["mean"] == pytest.approx(data.mean())
+    assert summary["std"] == pytest.approx(data.std())
+    assert summary["min"] == data.min()
+    assert summary["max"] == data.max()
+    assert summary["L2 norm"] == pytest.approx(np.linalg.norm(data))
+
+
+def test_empty_blocks_are_ignored():
+    blocks = [np.array([]), np.array([1.0, 2.0]), np.array([]), np.array([3.0])]
+    for order in permutations(blocks):
+        stats = merged(order)
+        assert stats.count == 3
+        assert stats.summary()["mean"] == pytest.approx(2.0)
+        assert (stats.min, stats.max) == (1.0, 3.0)
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_non_finite_values_do_not_depend_on_merge_order(value):
+    blocks = [np.array([1.0, 2.0]), np.array([value, 3.0]), np.array([])]
+    expected = np.array([1.0, 2.0, value, 3.0])
+    with np.errstate(invalid="ignore"):
+        for order in permutations(blocks):
+            stats = merged(order)
+            np.testing.assert_equal(stats.min, expected.min())
+            np.testing.assert_equal(stats.max, expected.max())
+
+
+def test_nan_propagates_to_the_summary():
+    with np.errstate(invalid="ignore"):
+        summary = merged([np.array([1.0]), np.array([np.nan]), np.array([2.0])])
+    for key in ("mean", "std", "min", "max"):
+        assert np.isnan(summary.summary()[key])
+
+
+def test_aggregate_stats_covers_all_rows():
+    data = np.arange(24.0).reshape(6, 4)
+    stats, nrows = aggregate_stats(data, workers=1)
+    assert nrows == 6
+    assert stats.summary()["mean"] == pytest.approx(data.mean())
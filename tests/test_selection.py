@@ -0,0 +1,38 @@
+import pytest
+
+from h5tui.selection import SelectionError, parse_selection
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("", ((), [])),
+        ("[100:200, ::10, 5]", ((slice(100, 200), slice(None, None, 10), 5), [])),
+        ("0:10, -1", ((slice(0, 10), -1), [])),
+        ("[..., 3]", ((Ellipsis, 3), [])),
+        ("[[1, 4, 7]]", (([1, 4, 7],), [])),
+        ("[0:10, 'x', 'y']", ((slice(0, 10),), ["x", "y"])),
+        ("[['x', 'y']]", ((), ["x", "y"])),
+    ],
+)
+def test_parse_selection(text, expected):
+    assert parse_selection(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[__import__('os').system('true')]",
+        "[len('abc')]",
+        "[1 + 2]",
+        "[x]",
+        "[a.b]",
+        "[1.5]",
+        "[lambda: 0]",
+        "[{0: 1}]",
+        "[0:10",
+    ],
+)
+def test_parse_selection_rejects_expressions(text):
+    with pytest.raises(SelectionError):
+        parse_selection(text)